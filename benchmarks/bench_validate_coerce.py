@@ -0,0 +1,67 @@
+# bench_validate_coerce.py
+"""
+Benchmark: fused validate_and_coerce vs. the old validate-then-transform path.
+
+The old path ran validate_movie on each row and then parsed the numeric
+fields again with transformers.to_int / to_float. validate_movie now wraps
+validate_and_coerce, so a verbatim copy of the old validator is kept in
+tests/legacy_validator.py as the baseline (the tests compare against it).
+
+Run from the project root:
+
+    python -m benchmarks.bench_validate_coerce [--repeat 20]
+"""
+
+import argparse
+import time
+
+from src.reader.data_reader import read_movies
+from src.validator.validator import validate_and_coerce, validate_and_coerce_batch
+from tests.legacy_validator import validate_then_transform
+
+
+def fused_per_row(rows):
+    valid = []
+    rejects = []
+    for r in rows:
+        values, error_reason = validate_and_coerce(r)
+        if values is None:
+            rejects.append((r, error_reason))
+        else:
+            valid.append(values)
+    return valid, rejects
+
+
+def _time_per_row(fn, rows, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - start)
+    return best / len(rows) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path", nargs="?", default="data/imdb_movie_dataset.csv")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = read_movies(args.path)
+    assert validate_then_transform(rows) == validate_and_coerce_batch(rows)
+
+    baseline = _time_per_row(validate_then_transform, rows, args.repeat)
+    results = [
+        ("validate_movie + to_int/to_float", baseline),
+        ("validate_and_coerce (per row)", _time_per_row(fused_per_row, rows, args.repeat)),
+        ("validate_and_coerce_batch", _time_per_row(validate_and_coerce_batch, rows, args.repeat)),
+    ]
+
+    print(f"{len(rows)} rows from {args.path}, best of {args.repeat}")
+    for name, us in results:
+        saved = baseline - us
+        print(f"  {name:34s} {us:6.2f} us/row  saved {saved:5.2f} us/row ({saved / baseline:6.1%})")
+
+
+if __name__ == "__main__":
+    main()
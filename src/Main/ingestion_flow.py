@@ -6,126 +6,183 @@ Reads raw movie rows from a CSV file, validates each record, and writes
 cleaned data into the stg_movies table in PostgreSQL. Any invalid rows,
 along with the validation error reason and original payload, are stored
 in stg_rejects for later inspection.
+
+Rows are validated and transformed once per batch and handed to a
+FanOutWriter, which delivers the same batch to every sink enabled in the
+`sinks:` section of config.yaml (staging tables, rejects_raw, the reject
+CSV and optional file outputs) in a single pass over the input. The
+input is memory-mapped (data_reader.MmapCsv) and each row is decoded only
+when the loop reaches it, so the file is never held as a list of dicts.
+The staging tables are committed every sinks.commit_chunk_size rows, and
+rows the database refuses are moved to stg_rejects instead of failing the
+run.
+
+The tables are created up front by db.create_tables. With --bulk-load (or
+ddl.bulk_load in config.yaml) secondary indexes are dropped for the run
+and rebuilt, followed by ANALYZE, at the end.
+
+With sinks.adaptive_batching enabled the batch size is retuned between
+batches from sink latency, throughput and RSS (src/load/batching.py); the
+sizes used and the reason for each change go to paths.run_metrics.
+
+Run with --profile to write per-stage cProfile/tracemalloc output next to
+the configured log file (see src/Main/profiling.py); each sink's writes
+are profiled on its own thread as stage sink.<name>.
 """
 
+from contextlib import ExitStack
+import argparse
 import json
-import psycopg2
-
-from src.reader.data_reader import read_movies
-from src.validator.validator import validate_movie
-from src.transform.transformers import to_int, to_float
-
-
-# --- DB connection details (same as DBeaver) ---
-DB_NAME = "ingestion"
-DB_USER = "revature"
-DB_PASSWORD = "12345"   # <-- change to your actual password if different
-DB_HOST = "localhost"
-DB_PORT = 5432
-
-
-def run_ingestion(path: str):
-    # 1. Read the data
-    rows = read_movies(path)
-    print(f"Read {len(rows)} rows from {path}")
-
-    # 2. Connect to Postgres
-    conn = psycopg2.connect(
-        dbname=DB_NAME,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        host=DB_HOST,
-        port=DB_PORT,
-    )
-    cur = conn.cursor()
-
-    insert_sql = """
-        INSERT INTO stg_movies (
-            rank_num,
-            title,
-            genre,
-            description,
-            director,
-            actors,
-            year,
-            runtime_minutes,
-            rating,
-            votes,
-            revenue_millions,
-            metascore
-        )
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-    """
-
-    reject_sql = """
-        INSERT INTO stg_rejects (
-            source_file,
-            raw_record,
-            error_reason
-        )
-        VALUES (%s, %s::jsonb, %s)
-    """
+import logging
+import os
+import time
+import yaml
+
+from src.reader.data_reader import MmapCsv
+from src.validator.validator import validate_and_coerce
+from src.load.batching import sizer_from_config
+from src.load.db import get_connection, create_tables, bulk_load
+from src.load.fanout import Batch, FanOutWriter, StagingTablesSink, build_sinks
+from src.Main.logging_config import setup_logging
+from src.Main.profiling import StageProfiler, add_profile_arguments, profiler_from_args
+
+logger = logging.getLogger(__name__)
+
+
+def run_ingestion(
+    path: str,
+    profiler: StageProfiler | None = None,
+    config_path: str = "config/config.yaml",
+    bulk: bool | None = None,
+):
+    if profiler is None:
+        profiler = StageProfiler(None, enabled=False)
+
+    with open(config_path, "r") as f:
+        cfg = yaml.safe_load(f)
+    sink_cfg = cfg.get("sinks") or {}
+    batch_size = int(sink_cfg.get("batch_size", 1000))
+    # None when adaptive_batching is off: batch_size stays fixed
+    sizer = sizer_from_config(sink_cfg)
+    started = time.perf_counter()
+    ddl_cfg = cfg.get("ddl") or {}
+    if bulk is None:
+        bulk = bool(ddl_cfg.get("bulk_load", False))
+
+    # 1. Map the file and index its rows; fields are decoded lazily below
+    with profiler.stage("read"):
+        csv_map = MmapCsv(path)
+    print(f"Read {len(csv_map)} rows from {path}")
 
     inserted = 0
     rejected = 0
-
-    for r in rows:
-        # 3. Validate row
-        is_valid, error_reason = validate_movie(r)
-
-        if not is_valid:
-            # bad row -> stg_rejects
-            cur.execute(
-                reject_sql,
-                (
-                    path,          # source_file
-                    json.dumps(r), # raw_record
-                    error_reason,  # error_reason
-                ),
-            )
-            rejected += 1
-            continue
-
-        # 4. Transform + insert row
-        rank_num = to_int(r.get("Rank"))
-        title = (r.get("Title") or "").strip()
-        genre = (r.get("Genre") or "").strip()
-        description = (r.get("Description") or "").strip()
-        director = (r.get("Director") or "").strip()
-        actors = (r.get("Actors") or "").strip()
-        year = to_int(r.get("Year"))
-        runtime_minutes = to_int(r.get("Runtime (Minutes)"))
-        rating = to_float(r.get("Rating"))
-        votes = to_int(r.get("Votes"))
-        revenue_millions = to_float(r.get("Revenue (Millions)"))
-        metascore = to_float(r.get("Metascore"))
-
-        cur.execute(
-            insert_sql,
-            (
-                rank_num,
-                title,
-                genre,
-                description,
-                director,
-                actors,
-                year,
-                runtime_minutes,
-                rating,
-                votes,
-                revenue_millions,
-                metascore,
-            ),
-        )
-        inserted += 1
-
-    conn.commit()
-    cur.close()
-    conn.close()
+    valid = []
+    rejects = []
+
+    sinks = build_sinks(cfg)
+
+    with ExitStack() as stack:
+        stack.enter_context(csv_map)
+        # 2. Own the DDL; in bulk mode indexes come back after the writers finish
+        if any(sink.needs_db for sink in sinks):
+            conn = stack.enter_context(get_connection(cfg["db"]))
+            create_tables(conn, unlogged=ddl_cfg.get("unlogged_staging"))
+            stack.enter_context(bulk_load(conn, enabled=bulk))
+
+        # 3. Open every configured sink (each with its own writer thread)
+        with FanOutWriter(
+            sinks,
+            on_write=sizer.observe if sizer else None,
+            profiler=profiler,
+        ) as writer:
+            if sizer:
+                sizer.expect(sink.name for sink in sinks)
+                batch_size = sizer.next_size()
+            for r in csv_map.iter_rows():
+                # 4. Validate + convert row (each field parsed once)
+                with profiler.stage("validate"):
+                    values, error_reason = validate_and_coerce(r)
+
+                if values is None:
+                    # bad row -> reject sinks
+                    rejects.append((r, error_reason))
+                    # sampled per reason by logging_config.RejectSampler
+                    logger.warning(
+                        "Rejected row Rank=%s: %s",
+                        r.get("Rank"),
+                        error_reason,
+                        extra={"reject_reason": error_reason},
+                    )
+                    rejected += 1
+                else:
+                    valid.append(values)
+                    inserted += 1
+
+                # 5. Hand full batches to all sinks at once
+                if len(valid) + len(rejects) >= batch_size:
+                    with profiler.stage("fanout"):
+                        writer.write(Batch(path, valid, rejects, sizer.batches if sizer else None))
+                    valid = []
+                    rejects = []
+                    if sizer:
+                        batch_size = sizer.next_size()
+
+            if valid or rejects:
+                with profiler.stage("fanout"):
+                    writer.write(Batch(path, valid, rejects, sizer.batches if sizer else None))
+
+    profiler.write()
+
+    # rows PostgreSQL refused moved from inserted to rejected
+    for sink in sinks:
+        if isinstance(sink, StagingTablesSink):
+            inserted, rejected = sink.inserted, sink.rejected
+
+    metrics = {
+        "source_file": path,
+        "inserted": inserted,
+        "rejected": rejected,
+        "seconds": round(time.perf_counter() - started, 3),
+        "batch_size": sizer.metrics() if sizer else {"fixed": batch_size},
+    }
+    write_run_metrics(cfg, metrics)
 
     print(f"Inserted {inserted} rows into stg_movies")
     print(f"Rejected {rejected} rows into stg_rejects")
+    logger.info("Run complete: inserted=%d, rejected=%d", inserted, rejected)
+    return metrics
+
+
+def write_run_metrics(cfg: dict, metrics: dict) -> None:
+    """Write the run metrics to paths.run_metrics, if configured."""
+    path = (cfg.get("paths") or {}).get("run_metrics")
+    if not path:
+        return
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(metrics, f, indent=2)
+    logger.info("Wrote run metrics to %s", path)
 
 
 if __name__ == "__main__":
-    run_ingestion("data/imdb_movie_dataset.csv")
+    parser = argparse.ArgumentParser(description="Load the IMDB CSV into stg_movies / stg_rejects.")
+    parser.add_argument("path", nargs="?", default="data/imdb_movie_dataset.csv")
+    parser.add_argument("--config", default="config/config.yaml")
+    parser.add_argument(
+        "--bulk-load",
+        action="store_true",
+        default=None,
+        help="drop secondary indexes for the run, rebuild and ANALYZE afterwards",
+    )
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    setup_logging(args.config)
+    run_ingestion(
+        args.path,
+        profiler=profiler_from_args(args, args.config),
+        config_path=args.config,
+        bulk=args.bulk_load,
+    )
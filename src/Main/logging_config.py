@@ -1,5 +1,10 @@
 # logging_config.py
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import threading
 import yaml
 from pathlib import Path
 """
@@ -8,39 +13,174 @@ Central logging configuration for the ingestion project.
 Initializes root logging based on paths defined in config/config.yaml,
 ensuring logs are written to a configured log file and echoed to the
 console. Safe to call multiple times without adding duplicate handlers.
+
+Records are handed to a QueueHandler on the calling thread and written to
+disk by a background QueueListener, so the ingestion loop never waits on
+file or console I/O. Reject messages (records logged with
+extra={"reject_reason": ...}) are sampled per reason before they are
+queued; the number of suppressed messages is kept and logged at shutdown.
 """
 
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(name)s - %(message)s"
 
-def setup_logging(config_path: str = "config/config.yaml") -> None:
+# Defaults for the optional `logging:` section of config.yaml
+DEFAULT_LOGGING = {
+    "level": "INFO",
+    "format": "text",          # "text" or "json" (one JSON object per line)
+    "reject_log_burst": 20,    # log the first N rejects of each reason ...
+    "reject_log_every": 1000,  # ... then only every N-th one
+}
+
+_listener = None
+_queue_handler = None
+_reject_sampler = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format each record as a single JSON line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        reason = getattr(record, "reject_reason", None)
+        if reason is not None:
+            entry["reject_reason"] = reason
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RejectSampler(logging.Filter):
     """
-    Configure root logging to write to the log file specified in config.yaml
-    (paths.log_file) and also echo to the console.
-    Safe to call multiple times; subsequent calls are no-ops if handlers exist.
+    Per-reason sampling for reject log messages.
+
+    The first `burst` records of each reject_reason pass through; after that
+    only every `every`-th one does. Records without a reject_reason are never
+    filtered. Suppressed counts are kept per reason.
     """
-    if logging.getLogger().handlers:
-        # Already configured → don't add duplicate handlers
-        return
 
+    def __init__(self, burst: int = 20, every: int = 1000):
+        super().__init__()
+        self.burst = burst
+        self.every = max(1, every)
+        self._seen = {}
+        self._suppressed = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        reason = getattr(record, "reject_reason", None)
+        if reason is None:
+            return True
+
+        with self._lock:
+            seen = self._seen.get(reason, 0) + 1
+            self._seen[reason] = seen
+            if seen <= self.burst or (seen - self.burst) % self.every == 0:
+                return True
+            self._suppressed[reason] = self._suppressed.get(reason, 0) + 1
+            return False
+
+    def suppressed_counts(self) -> dict:
+        with self._lock:
+            return dict(self._suppressed)
+
+
+def _load_config(config_path: str) -> dict:
     with open(config_path, "r") as f:
-        cfg = yaml.safe_load(f)
+        return yaml.safe_load(f)
+
 
+def resolve_log_path(config_path: str = "config/config.yaml") -> Path:
+    """
+    Return the absolute path of paths.log_file from config.yaml.
+    Relative paths are resolved against the project root.
+    """
+    cfg = _load_config(config_path)
     log_file = cfg["paths"]["log_file"]
-    
+
     # Resolve log path relative to project root (assuming config is in <root>/config/config.yaml)
     # config_path might be absolute or relative.
     config_path_obj = Path(config_path).resolve()
     # If config is in .../config/config.yaml, parent is .../config, parent.parent is project root
     project_root = config_path_obj.parent.parent
     
-    log_path = project_root / log_file
+    return project_root / log_file
+
+
+def setup_logging(config_path: str = "config/config.yaml") -> None:
+    """
+    Configure root logging to write to the log file specified in config.yaml
+    (paths.log_file) and also echo to the console.
+    Safe to call multiple times; subsequent calls are no-ops if handlers exist.
+    """
+    global _listener, _queue_handler, _reject_sampler
+
+    if logging.getLogger().handlers:
+        # Already configured → don't add duplicate handlers
+        return
+
+    settings = dict(DEFAULT_LOGGING)
+    settings.update(_load_config(config_path).get("logging") or {})
 
+    log_path = resolve_log_path(config_path)
     log_path.parent.mkdir(parents=True, exist_ok=True)
 
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
-        handlers=[
-            logging.FileHandler(log_path),
-            logging.StreamHandler(),
-        ],
+    if settings["format"] == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT)
+
+    file_handler = logging.FileHandler(log_path)
+    console_handler = logging.StreamHandler()
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
     )
+
+    _reject_sampler = RejectSampler(
+        burst=int(settings["reject_log_burst"]),
+        every=int(settings["reject_log_every"]),
+    )
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    _queue_handler.addFilter(_reject_sampler)
+
+    root = logging.getLogger()
+    root.setLevel(settings["level"])
+    root.addHandler(_queue_handler)
+
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def suppressed_reject_counts() -> dict:
+    """Return {reject_reason: suppressed message count} for this process."""
+    if _reject_sampler is None:
+        return {}
+    return _reject_sampler.suppressed_counts()
+
+
+def shutdown_logging() -> None:
+    """
+    Log a summary of suppressed reject messages, then flush and stop the
+    background writer. Registered with atexit by setup_logging.
+    """
+    global _listener, _queue_handler
+
+    if _listener is None:
+        return
+
+    logger = logging.getLogger(__name__)
+    for reason, count in sorted(suppressed_reject_counts().items()):
+        logger.info("Suppressed %d reject log messages for reason: %s", count, reason)
+
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener.stop()
+    _listener = None
+    _queue_handler = None
@@ -0,0 +1,196 @@
+# profiling.py
+"""
+Opt-in per-stage profiling for the ingestion entry points.
+
+Wraps each pipeline stage in cProfile and tracemalloc and writes the results
+next to the log file configured in config.yaml (paths.log_file):
+
+  - <log name>.<stage>.pstats   cProfile dump per stage (open with pstats/snakeviz)
+  - <log name>.alloc.txt        top-N allocation sites per stage
+
+Stages entered once per row can be sampled (sample_rate < 1) so profiling a
+full-size input only instruments every k-th entry and overhead stays bounded.
+
+cProfile only sees the thread that enables it, so the fan-out sinks enter
+their own `sink.<name>` stage on their writer threads (see fanout.Sink);
+the producer's "fanout" stage then only covers handing batches over.
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+import argparse
+import cProfile
+import logging
+import threading
+import tracemalloc
+
+from src.Main.logging_config import resolve_log_path
+
+logger = logging.getLogger(__name__)
+
+
+class StageProfiler:
+    """
+    Collects one cProfile.Profile and one allocation table per stage name.
+
+    When `enabled` is False every stage() is a plain pass-through, so call
+    sites do not need to branch on whether profiling was requested.
+
+    stage() may be entered from several threads at once, as long as each
+    stage name is only used by one thread. Allocation tracking is process
+    wide: while stages overlap, the first one traces for all of them.
+    """
+
+    def __init__(
+        self,
+        log_path,
+        enabled: bool = True,
+        sample_rate: float = 1.0,
+        top_n: int = 25,
+        nframes: int = 1,
+    ):
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate must be in (0, 1]")
+
+        self.enabled = enabled
+        self.log_path = Path(log_path) if log_path is not None else None
+        self.top_n = top_n
+        self.nframes = nframes
+        self._every = max(1, round(1 / sample_rate))
+
+        self._calls = defaultdict(int)
+        self._sampled = defaultdict(int)
+        self._profiles = {}
+        # stage -> {allocation site: [size, count]}
+        self._allocs = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+        self._peaks = defaultdict(int)
+        self._lock = threading.Lock()
+        # name of the stage running on this thread, for nesting
+        self._local = threading.local()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Profile the enclosed block as stage `name` (subject to sampling)."""
+        if not self.enabled or getattr(self._local, "active", None) is not None:
+            # Nested stages are attributed to the enclosing one.
+            yield
+            return
+
+        with self._lock:
+            self._calls[name] += 1
+            sampled = not (self._calls[name] - 1) % self._every
+            if sampled:
+                self._sampled[name] += 1
+                profile = self._profiles.get(name)
+                if profile is None:
+                    profile = self._profiles[name] = cProfile.Profile()
+
+                # Trace only while the stage runs: the snapshot then holds
+                # just the allocations this stage made and kept, and its cost
+                # does not grow with the rest of the heap. If something else
+                # is already tracing, leave it alone and skip allocation
+                # tracking.
+                trace_allocs = not tracemalloc.is_tracing()
+                if trace_allocs:
+                    tracemalloc.start(self.nframes)
+        if not sampled:
+            yield
+            return
+
+        self._local.active = name
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._local.active = None
+            if trace_allocs:
+                with self._lock:
+                    snapshot = tracemalloc.take_snapshot()
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    self._record_allocs(name, snapshot, peak)
+
+    def _record_allocs(self, name: str, snapshot, peak: int) -> None:
+        self._peaks[name] = max(self._peaks[name], peak)
+        sites = self._allocs[name]
+        snapshot = snapshot.filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)]
+        )
+        for stat in snapshot.statistics("lineno"):
+            frame = stat.traceback[0]
+            site = sites[f"{frame.filename}:{frame.lineno}"]
+            site[0] += stat.size
+            site[1] += stat.count
+
+    def write(self) -> list:
+        """
+        Dump per-stage .pstats files and the allocation report.
+        Returns the list of files written.
+        """
+        if not self.enabled or not self._profiles:
+            return []
+
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        written = []
+
+        for name, profile in self._profiles.items():
+            stats_path = self._output_path(f"{name}.pstats")
+            profile.dump_stats(str(stats_path))
+            written.append(stats_path)
+
+        report_path = self._output_path("alloc.txt")
+        with open(report_path, "w", encoding="utf-8") as f:
+            for name in self._profiles:
+                f.write(
+                    f"== stage {name}: sampled {self._sampled[name]} of "
+                    f"{self._calls[name]} calls, peak traced "
+                    f"{self._peaks[name] / 1024:.1f} KiB\n"
+                )
+                top = sorted(
+                    self._allocs[name].items(), key=lambda kv: kv[1][0], reverse=True
+                )[: self.top_n]
+                for site, (size, count) in top:
+                    f.write(f"{size / 1024:10.1f} KiB {count:8d} blocks  {site}\n")
+                f.write("\n")
+        written.append(report_path)
+
+        logger.info("Wrote profiling output: %s", ", ".join(str(p) for p in written))
+        return written
+
+    def _output_path(self, suffix: str) -> Path:
+        return self.log_path.with_name(f"{self.log_path.stem}.{suffix}")
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    """Register the shared --profile options on an entry point's parser."""
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="profile each pipeline stage with cProfile and tracemalloc",
+    )
+    parser.add_argument(
+        "--profile-sample",
+        type=float,
+        default=1.0,
+        metavar="RATE",
+        help="fraction of stage entries to instrument, e.g. 0.01 (default: 1.0)",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=25,
+        metavar="N",
+        help="allocation sites to list per stage (default: 25)",
+    )
+
+
+def profiler_from_args(args, config_path: str = "config/config.yaml") -> StageProfiler:
+    """Build a StageProfiler from parsed args; disabled unless --profile was given."""
+    return StageProfiler(
+        resolve_log_path(config_path),
+        enabled=args.profile,
+        sample_rate=args.profile_sample,
+        top_n=args.profile_top,
+    )
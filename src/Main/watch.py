@@ -0,0 +1,454 @@
+# watch.py
+"""
+Long-running micro-batch ingestion of a watched drop directory.
+
+Instead of a cron job that re-reads everything, this mode watches
+`watch.directory` (inotify through ctypes on Linux, stat polling
+elsewhere) and ingests only what is new: files dropped into the directory
+and rows appended to files already there. Per-file offsets are kept in
+`watch.state_file` (see data_reader.read_new_records), so a restart
+resumes where the last committed micro-batch ended.
+
+New records are collected until `latency_target_ms` has passed since the
+first of them arrived (or `max_batch_rows` are waiting), then flushed as
+one micro-batch:
+
+  - movie records (CSV or JSON with the IMDB columns) are validated and
+    sent through the configured fan-out sinks, as in ingestion_flow
+  - any other JSON/CSV records (e.g. data/customers.json) land as JSONB in
+    raw_records
+
+Offsets are saved only after a micro-batch has been committed, so delivery
+is at-least-once: a crash between the commit and the state write replays
+that micro-batch. A micro-batch that fails (e.g. the database is briefly
+unreachable) is logged and retried with exponential backoff
+(watch.retry_seconds up to watch.retry_max_seconds) without advancing
+the offsets. Raw records PostgreSQL still refuses after JSONB
+sanitizing are isolated and kept in rejects_raw, so one bad record
+cannot block its file. Files holding only raw records get their offsets saved
+right after the raw_records commit, before the movie fan-out, so a
+failing fan-out does not insert them twice (a file mixing movie and
+other records is replayed whole).
+
+With sinks.data_profile enabled the committed movie rows of every
+micro-batch are merged into one DatasetProfile, stored as a single
+ingestion_profiles row (source_file = the directory) when the run stops.
+
+Usage (from the project root):
+
+    python -m src.Main.watch [directory] [--once]
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Set
+import argparse
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import select
+import signal
+import struct
+import time
+import yaml
+
+from src.load.db import get_connection, create_tables
+from src.load.fanout import Batch, FanOutWriter, build_sinks
+from src.load.loaders import insert_bisecting, insert_profile, insert_raw_records, insert_rejects
+from src.Main.logging_config import setup_logging
+from src.reader.data_reader import CSV_SUFFIXES, JSON_SUFFIXES, read_new_records
+from src.transform.data_profile import profile_from_config
+from src.validator.validator import validate_and_coerce_batch
+
+logger = logging.getLogger(__name__)
+
+# Columns that mark a record as an IMDB movie row
+MOVIE_KEYS = frozenset(("Rank", "Title", "Year"))
+
+# inotify(7) event bits
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+_EVENT = struct.Struct("iIII")
+
+
+def is_watched_file(name: str) -> bool:
+    """CSV/JSON files, skipping hidden files and in-progress downloads."""
+    if name.startswith(".") or name.endswith((".tmp", ".part")):
+        return False
+    return name.endswith(CSV_SUFFIXES + JSON_SUFFIXES)
+
+
+class PollingWatcher:
+    """Fallback watcher: wakes up every poll_seconds and reports a full rescan."""
+
+    name = "poll"
+
+    def __init__(self, directory: str, poll_seconds: float = 1.0):
+        self.directory = directory
+        self.poll_seconds = poll_seconds
+
+    def wait(self, timeout: float) -> Optional[Set[str]]:
+        """Block up to `timeout`; None means 'check every file'."""
+        time.sleep(max(0.0, min(timeout, self.poll_seconds)))
+        return None
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Directory watcher on Linux inotify, called through ctypes."""
+
+    name = "inotify"
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.directory = directory
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def wait(self, timeout: float) -> Optional[Set[str]]:
+        """
+        Block up to `timeout` for events; returns the changed file names, or
+        None if the kernel queue overflowed and every file must be checked.
+        """
+        ready, _, _ = select.select([self.fd], [], [], max(0.0, timeout))
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        names = set()
+        pos = 0
+        while pos + _EVENT.size <= len(data):
+            _, mask, _, length = _EVENT.unpack_from(data, pos)
+            pos += _EVENT.size
+            name = data[pos:pos + length].rstrip(b"\0")
+            pos += length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if name:
+                names.add(os.fsdecode(name))
+        return names
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def make_watcher(directory: str, mode: str = "auto", poll_seconds: float = 1.0):
+    """inotify when available (mode auto/inotify), stat polling otherwise."""
+    if mode in ("auto", "inotify"):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError):
+            if mode == "inotify":
+                raise
+            logger.info("inotify unavailable, polling %s every %.1fs", directory, poll_seconds)
+    return PollingWatcher(directory, poll_seconds)
+
+
+def load_state(path: str) -> Dict[str, dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_state(path: str, state: Dict[str, dict]) -> None:
+    """Write the offsets atomically (temp file + rename)."""
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _as_movie_row(record: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """JSON values as the strings csv.DictReader would produce."""
+    return {key: None if value is None else str(value) for key, value in record.items()}
+
+
+class DirectoryIngestor:
+    """
+    Micro-batch loop over one drop directory. `cfg` is the parsed
+    config.yaml; the `watch:` section tunes it.
+    """
+
+    def __init__(self, cfg: dict, directory: Optional[str] = None):
+        watch_cfg = cfg.get("watch") or {}
+        self.cfg = cfg
+        self.directory = directory or watch_cfg.get("directory", "data/incoming")
+        self.state_file = watch_cfg.get("state_file", "outputs/watch_state.json")
+        self.latency = float(watch_cfg.get("latency_target_ms", 2000)) / 1000.0
+        self.max_batch_rows = int(watch_cfg.get("max_batch_rows", 5000))
+        self.rescan_seconds = float(watch_cfg.get("rescan_seconds", 30))
+        self.read_chunk_bytes = int(watch_cfg.get("read_chunk_bytes", 8 << 20))
+        self.max_record_bytes = int(watch_cfg.get("max_record_bytes", 64 << 20))
+        self.mode = watch_cfg.get("mode", "auto")
+        self.poll_seconds = float(watch_cfg.get("poll_seconds", 1.0))
+        self.retry_seconds = float(watch_cfg.get("retry_seconds", 1.0))
+        self.retry_max_seconds = float(watch_cfg.get("retry_max_seconds", 60.0))
+
+        self.state = load_state(self.state_file)
+        # one profile for the whole run; build_sinks(append=True) has no profile sink
+        self.profile = profile_from_config(cfg) if (cfg.get("sinks") or {}).get("data_profile") else None
+        # records read but not yet committed: path -> list, plus new offsets
+        self._pending: Dict[str, List[Any]] = {}
+        self._pending_state: Dict[str, dict] = {}
+        self._pending_rows = 0
+        self._first_pending = None
+        # failed flushes in a row, and when the next attempt is allowed
+        self._failures = 0
+        self._retry_at = None
+        self._stop = False
+        self.totals = {"batches": 0, "movies": 0, "rejected": 0, "raw_records": 0}
+
+    def stop(self, *_args) -> None:
+        self._stop = True
+
+    # --- reading ---------------------------------------------------------
+
+    def _read_files(self, names: Optional[Iterable[str]]) -> None:
+        if names is None:
+            names = os.listdir(self.directory)
+        for name in sorted(names):
+            if not is_watched_file(name):
+                continue
+            path = os.path.join(self.directory, name)
+            if not os.path.isfile(path):
+                continue
+            # keep reading until the file is drained or the batch is full
+            while self._pending_rows < self.max_batch_rows:
+                state = self._pending_state.get(path, self.state.get(path))
+                try:
+                    records, new_state = read_new_records(
+                        path, state, self.read_chunk_bytes, self.max_record_bytes
+                    )
+                except (OSError, ValueError):
+                    logger.exception("Could not read %s", path)
+                    break
+                if new_state != state:
+                    self._pending_state[path] = new_state
+                if not records:
+                    break
+                self._pending.setdefault(path, []).extend(records)
+                self._pending_rows += len(records)
+                if self._first_pending is None:
+                    self._first_pending = time.monotonic()
+
+    # --- flushing --------------------------------------------------------
+
+    def flush(self) -> None:
+        """Load the pending records as one micro-batch, then save offsets."""
+        if self._pending:
+            files, rows = len(self._pending), self._pending_rows
+            movie_batches = []
+            raw = []
+            for path, records in self._pending.items():
+                movies = [_as_movie_row(r) for r in records if isinstance(r, dict) and MOVIE_KEYS <= r.keys()]
+                others = [r for r in records if not (isinstance(r, dict) and MOVIE_KEYS <= r.keys())]
+                if movies:
+                    valid, rejects = validate_and_coerce_batch(movies)
+                    movie_batches.append(Batch(path, valid, rejects))
+                if others:
+                    raw.append((path, others))
+
+            if raw:
+                with get_connection(self.cfg["db"]) as conn:
+                    for path, records in raw:
+                        refused = insert_bisecting(
+                            conn, records, lambda part, path=path: insert_raw_records(conn, path, part)
+                        )
+                        self.totals["raw_records"] += len(records) - len(refused)
+                        if refused:
+                            logger.warning("Database refused %d raw records from %s", len(refused), path)
+                            insert_rejects(
+                                conn,
+                                (
+                                    {
+                                        "source_file": path,
+                                        "raw_record": {"record": repr(record)},
+                                        "error_reason": reason,
+                                    }
+                                    for record, reason in refused
+                                ),
+                                commit=False,
+                            )
+                    conn.commit()
+                # raw_records is committed: a failing fan-out below must not
+                # replay these files into it again
+                movie_paths = {batch.source_file for batch in movie_batches}
+                done = [path for path, _ in raw if path not in movie_paths]
+                self._save_offsets(done)
+                for path in done:
+                    self._pending_rows -= len(self._pending.pop(path))
+            if movie_batches:
+                with FanOutWriter(build_sinks(self.cfg, append=True)) as writer:
+                    for batch in movie_batches:
+                        writer.write(batch)
+                for batch in movie_batches:
+                    self.totals["movies"] += len(batch.valid)
+                    self.totals["rejected"] += len(batch.rejects)
+                    if self.profile is not None:
+                        self.profile.update(batch.valid, rejected=len(batch.rejects))
+
+            self.totals["batches"] += 1
+            logger.info(
+                "Micro-batch %d: %d records from %d files (waited %.2fs)",
+                self.totals["batches"],
+                rows,
+                files,
+                time.monotonic() - self._first_pending,
+            )
+
+        # offsets move only once the records are committed
+        self._save_offsets(list(self._pending_state))
+        self._pending = {}
+        self._pending_state = {}
+        self._pending_rows = 0
+        self._first_pending = None
+
+    def _save_offsets(self, paths: Iterable[str]) -> None:
+        """Move the pending offsets of `paths` into the saved state."""
+        moved = False
+        for path in paths:
+            if path in self._pending_state:
+                self.state[path] = self._pending_state.pop(path)
+                moved = True
+        if moved:
+            save_state(self.state_file, self.state)
+
+    def _store_profile(self) -> None:
+        if self.profile is None or not (self.profile.rows or self.profile.rejected):
+            return
+        try:
+            with get_connection(self.cfg["db"]) as conn:
+                insert_profile(conn, self.directory, self.profile)
+                conn.commit()
+        except Exception:
+            logger.exception("Could not store the column profile for %s", self.directory)
+
+    def _try_flush(self) -> bool:
+        """
+        flush(), logging a failure instead of raising; the pending records
+        and offsets stay as they were and the next attempt is delayed.
+        """
+        try:
+            self.flush()
+        except Exception:
+            self._failures += 1
+            delay = min(self.retry_max_seconds, self.retry_seconds * 2 ** (self._failures - 1))
+            self._retry_at = time.monotonic() + delay
+            logger.exception(
+                "Micro-batch failed (%d in a row); offsets not advanced, retrying in %.1fs",
+                self._failures,
+                delay,
+            )
+            return False
+        self._failures = 0
+        self._retry_at = None
+        return True
+
+    def _due(self) -> bool:
+        if self._retry_at is not None and time.monotonic() < self._retry_at:
+            return False
+        if self._pending_rows >= self.max_batch_rows:
+            return True
+        return self._first_pending is not None and time.monotonic() - self._first_pending >= self.latency
+
+    # --- main loop -------------------------------------------------------
+
+    def run(self, once: bool = False) -> dict:
+        """
+        Ingest what is already in the directory, then (unless `once`) keep
+        watching until stop() or SIGINT/SIGTERM. Returns the run totals.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with get_connection(self.cfg["db"]) as conn:
+            create_tables(conn)
+
+        if once:
+            self._read_files(None)
+            while self._pending_rows:
+                self.flush()
+                self._read_files(None)
+            self.flush()
+            self._store_profile()
+            return self.totals
+
+        watcher = make_watcher(self.directory, self.mode, self.poll_seconds)
+        logger.info(
+            "Watching %s (%s), latency target %.0f ms",
+            self.directory,
+            watcher.name,
+            self.latency * 1000,
+        )
+        next_rescan = time.monotonic()
+        try:
+            while not self._stop:
+                now = time.monotonic()
+                if now >= next_rescan:
+                    # catches anything the watcher missed
+                    self._read_files(None)
+                    next_rescan = now + self.rescan_seconds
+                if self._due():
+                    if self._try_flush():
+                        # the batch may have been cut short by max_batch_rows
+                        self._read_files(None)
+                    continue
+
+                deadline = next_rescan
+                if self._first_pending is not None:
+                    deadline = min(deadline, max(self._first_pending + self.latency, self._retry_at or 0))
+                # short waits so stop() is noticed promptly
+                changed = watcher.wait(min(1.0, max(0.0, deadline - time.monotonic())))
+                if changed is None or changed:
+                    self._read_files(changed)
+            self._try_flush()
+            self._store_profile()
+        finally:
+            watcher.close()
+        return self.totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest CSV/JSON files dropped into a directory.")
+    parser.add_argument("directory", nargs="?", default=None)
+    parser.add_argument("--config", default="config/config.yaml")
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="ingest what is new in the directory and exit instead of watching",
+    )
+    args = parser.parse_args()
+
+    setup_logging(args.config)
+    with open(args.config, "r") as f:
+        cfg = yaml.safe_load(f)
+
+    ingestor = DirectoryIngestor(cfg, args.directory)
+    signal.signal(signal.SIGTERM, ingestor.stop)
+    signal.signal(signal.SIGINT, ingestor.stop)
+    totals = ingestor.run(once=args.once)
+    print(
+        f"{totals['batches']} micro-batches: {totals['movies']} movies, "
+        f"{totals['rejected']} rejected, {totals['raw_records']} raw records"
+    )
@@ -0,0 +1,242 @@
+# batching.py
+"""
+Adaptive batch sizing for the batched load paths.
+
+A fixed batch size is wrong for some input: wide rows (long Description
+text) make big batches expensive in memory, narrow rows leave the database
+round trip underused. AdaptiveBatchSizer picks the next batch size from
+what the run has measured so far:
+
+  - flush latency: seconds per row written by each sink, smoothed; the
+    slowest sink sets the pace, and the size is steered towards
+    target_latency_ms per flush
+  - throughput: rows/s of the slowest sink; a size increase that lowers
+    it is undone and the old size becomes the ceiling for the rest of the
+    run
+
+Sinks report flushes from behind their queues, so right after a change
+the observations still come from batches cut at the old size. Every batch
+is therefore tagged with the sequence number it was cut at (fanout.Batch.seq)
+and measurements start afresh at each change: decisions, including the
+verdict on a size increase, only use batches cut at the current size.
+  - process RSS: above max_rss_mb the size is halved (again only if RSS
+    keeps rising), near it the size is not grown
+
+Sizes always stay within [min_size, max_size]. Every change is recorded
+with its reason and measurements; metrics() returns them for the run
+metrics file.
+"""
+
+from typing import Dict, Iterable, List, Optional
+import logging
+import os
+import resource
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Latency band around the target inside which the size is left alone
+LOW_WATER = 0.75
+HIGH_WATER = 1.25
+# Largest step per decision
+MAX_GROWTH = 2.0
+MAX_SHRINK = 0.5
+# Growth that costs more than this share of throughput is undone
+THROUGHPUT_DROP = 0.10
+# Weight of the newest measurement in the per-row latency average
+EWMA_ALPHA = 0.5
+# Above this share of max_rss_mb the size is no longer grown
+RSS_HEADROOM = 0.8
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MiB."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # no procfs: peak RSS (KiB on Linux) is the best we have
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class AdaptiveBatchSizer:
+    """
+    Thread-safe batch size controller. Sink writer threads report flushes
+    with observe(); the producer asks next_size() before cutting each batch
+    and tags that batch with `batches` (the sequence number it is cut at).
+    """
+
+    def __init__(
+        self,
+        initial: int = 1000,
+        min_size: int = 100,
+        max_size: int = 20000,
+        target_latency_ms: float = 250,
+        max_rss_mb: Optional[float] = None,
+        rss_probe=current_rss_mb,
+    ):
+        if not 0 < min_size <= max_size:
+            raise ValueError("need 0 < min_size <= max_size")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target = target_latency_ms / 1000.0
+        self.max_rss_mb = max_rss_mb
+        self.rss_probe = rss_probe
+
+        self.size = self._clamp(initial)
+        self.initial = self.size
+        self.batches = 0
+        self.decisions: List[dict] = []
+
+        self._lock = threading.Lock()
+        # sink name -> smoothed seconds per row, over batches cut at the
+        # current size only
+        self._seconds_per_row: Dict[str, float] = {}
+        # sequence number of the first batch cut at the current size
+        self._window_start = 0
+        self._expected = set()
+        self._ceiling = max_size
+        # (size before, rows/s before) of the last increase, until judged
+        self._last_growth = None
+        # RSS at the last memory-driven shrink; RSS rarely goes back down,
+        # so only shrink again if it keeps growing
+        self._rss_at_shrink = None
+
+    def _clamp(self, size: float) -> int:
+        return int(max(self.min_size, min(self.max_size, size)))
+
+    def expect(self, sources: Iterable[str]) -> None:
+        """
+        Hold decisions until every one of `sources` has reported a flush, so
+        a fast sink that reports first cannot size batches for a slow one.
+        """
+        with self._lock:
+            self._expected.update(sources)
+
+    def observe(self, source: str, rows: int, seconds: float, seq: Optional[int] = None) -> None:
+        """
+        Record one flush of `rows` rows that took `seconds` in `source`.
+        `seq` is the sequence number the batch was cut at; flushes of
+        batches cut before the last size change are ignored. None counts as
+        a batch cut at the current size.
+        """
+        if rows <= 0:
+            return
+        per_row = max(seconds, 1e-9) / rows
+        with self._lock:
+            if seq is not None and seq < self._window_start:
+                return
+            old = self._seconds_per_row.get(source)
+            self._seconds_per_row[source] = (
+                per_row if old is None else EWMA_ALPHA * per_row + (1 - EWMA_ALPHA) * old
+            )
+
+    def next_size(self) -> int:
+        """Size for the next batch; adjusts it when the measurements say so."""
+        self.batches += 1
+        rss = self.rss_probe() if self.max_rss_mb else None
+        with self._lock:
+            if self._expected <= self._seconds_per_row.keys():
+                per_row = max(self._seconds_per_row.values(), default=None)
+            else:
+                per_row = None
+
+        if rss is not None and rss > self.max_rss_mb:
+            if self._rss_at_shrink is None or rss > self._rss_at_shrink:
+                self._rss_at_shrink = rss
+                self._change(
+                    self.size * MAX_SHRINK,
+                    f"RSS {rss:.0f} MB above limit {self.max_rss_mb:.0f} MB",
+                    per_row,
+                    rss,
+                )
+            return self.size
+        if per_row is None:
+            return self.size
+
+        rows_per_s = 1.0 / per_row
+        latency = per_row * self.size
+
+        if self._last_growth is not None:
+            before_size, before_rate = self._last_growth
+            self._last_growth = None
+            if rows_per_s < (1 - THROUGHPUT_DROP) * before_rate:
+                self._ceiling = before_size
+                self._change(
+                    before_size,
+                    f"throughput fell from {before_rate:.0f} to {rows_per_s:.0f} rows/s",
+                    per_row,
+                    rss,
+                )
+                return self.size
+
+        wanted = self.target / per_row
+        if latency > HIGH_WATER * self.target:
+            self._change(
+                max(wanted, self.size * MAX_SHRINK),
+                f"flush latency {latency * 1000:.0f} ms above target {self.target * 1000:.0f} ms",
+                per_row,
+                rss,
+            )
+        elif latency < LOW_WATER * self.target and self.size < self._ceiling:
+            if rss is not None and rss > RSS_HEADROOM * self.max_rss_mb:
+                return self.size
+            grown = min(wanted, self.size * MAX_GROWTH, self._ceiling)
+            before = (self.size, rows_per_s)
+            if self._change(
+                grown,
+                f"flush latency {latency * 1000:.0f} ms below target {self.target * 1000:.0f} ms",
+                per_row,
+                rss,
+            ):
+                self._last_growth = before
+        return self.size
+
+    def _change(self, new_size: float, reason: str, per_row, rss) -> bool:
+        new_size = self._clamp(new_size)
+        if new_size == self.size:
+            return False
+        decision = {
+            "batch": self.batches,
+            "from": self.size,
+            "to": new_size,
+            "reason": reason,
+            "latency_ms": round(per_row * self.size * 1000, 2) if per_row else None,
+            "rows_per_s": round(1.0 / per_row) if per_row else None,
+            "rss_mb": round(rss, 1) if rss is not None else None,
+        }
+        self.decisions.append(decision)
+        logger.info("Batch size %d -> %d: %s", self.size, new_size, reason)
+        self.size = new_size
+        # this call's batch is the first one cut at the new size
+        with self._lock:
+            self._window_start = self.batches
+            self._seconds_per_row = {}
+        return True
+
+    def metrics(self) -> dict:
+        sizes = [self.initial] + [d["to"] for d in self.decisions]
+        return {
+            "initial_size": self.initial,
+            "final_size": self.size,
+            "min_size_used": min(sizes),
+            "max_size_used": max(sizes),
+            "batches": self.batches,
+            "decisions": self.decisions,
+        }
+
+
+def sizer_from_config(sink_cfg: dict) -> Optional[AdaptiveBatchSizer]:
+    """AdaptiveBatchSizer from sinks.adaptive_batching, or None if disabled."""
+    adaptive = sink_cfg.get("adaptive_batching") or {}
+    if not adaptive.get("enabled", False):
+        return None
+    max_rss = adaptive.get("max_rss_mb")
+    return AdaptiveBatchSizer(
+        initial=int(sink_cfg.get("batch_size", 1000)),
+        min_size=int(adaptive.get("min_size", 100)),
+        max_size=int(adaptive.get("max_size", 20000)),
+        target_latency_ms=float(adaptive.get("target_latency_ms", 250)),
+        max_rss_mb=float(max_rss) if max_rss else None,
+    )
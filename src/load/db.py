@@ -3,8 +3,16 @@
 Database helper module for the IMDB ingestion project.
 
 Provides a context-managed PostgreSQL connection factory using settings
-from config.yaml, and a utility to create required audit tables (like
-`rejects_raw`) used to store raw rejected records and error reasons.
+from config.yaml, and owns the project's DDL: the year-partitioned
+`stg_movies` staging table, `stg_rejects`, the `rejects_raw` audit
+table used to store raw rejected records and error reasons, and the
+`ingestion_profiles` table of per-run column profiles, the
+year/genre/director rollup tables and `raw_records` for non-movie sources.
+
+For large backfills, bulk_load() drops the secondary indexes before the
+load and rebuilds them (followed by ANALYZE) afterwards, and the staging
+tables can be created UNLOGGED (`ddl.unlogged_staging` in config.yaml) to
+skip WAL.
 """
 
 from contextlib import contextmanager
@@ -41,15 +49,113 @@ def get_connection(db_config: dict):
             logger.info("Database connection closed")
 
 
-def create_tables(conn):
+# stg_movies is range-partitioned on year, one partition per decade
+# (validate_movie only accepts 1900-2030); anything else lands in the
+# default partition.
+PARTITION_FIRST_YEAR = 1900
+PARTITION_LAST_YEAR = 2039
+PARTITION_SPAN = 10
+
+# Secondary indexes dropped during bulk loads and rebuilt afterwards
+SECONDARY_INDEXES = {
+    "stg_movies_title_idx": "CREATE INDEX IF NOT EXISTS stg_movies_title_idx ON stg_movies (title)",
+    "stg_movies_director_idx": "CREATE INDEX IF NOT EXISTS stg_movies_director_idx ON stg_movies (director)",
+    "stg_movies_genre_idx": "CREATE INDEX IF NOT EXISTS stg_movies_genre_idx ON stg_movies (genre)",
+    "stg_rejects_source_file_idx": "CREATE INDEX IF NOT EXISTS stg_rejects_source_file_idx ON stg_rejects (source_file)",
+}
+
+STAGING_TABLES = ("stg_movies", "stg_rejects")
+
+# Rollup table -> (stg_movies grouping column, key type); maintained by
+# src/load/rollups.py
+ROLLUP_TABLES = {
+    "rollup_year": ("year", "INTEGER"),
+    "rollup_genre": ("genre", "TEXT"),
+    "rollup_director": ("director", "TEXT"),
+}
+
+
+def _movie_partitions():
+    """Yield (partition name, FROM year, TO year) for stg_movies."""
+    for start in range(PARTITION_FIRST_YEAR, PARTITION_LAST_YEAR + 1, PARTITION_SPAN):
+        yield f"stg_movies_y{start}", start, start + PARTITION_SPAN
+
+
+def _relkind(cur, table: str):
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def create_tables(conn, unlogged: bool | None = None):
     """
     Create tables needed by the IMDB ingestion project.
 
-    `stg_movies` and `stg_rejects` are managed by load_imdb.py /
-    pandas, so this function only ensures the extra audit table
-    `rejects_raw` exists.
+    - `stg_movies`, range-partitioned by year (one partition per decade plus
+      a default partition)
+    - `stg_rejects`
+    - `rejects_raw`, the extra audit table
+    - `ingestion_profiles`, one column profile per run (data_profile.py)
+    - `raw_records`, non-movie records (e.g. JSON files) landed by watch mode
+    - the ROLLUP_TABLES (year / genre / director aggregates, rollups.py)
+    - the secondary indexes in SECONDARY_INDEXES
+
+    With unlogged=True the stg_movies partitions and stg_rejects are created
+    UNLOGGED and existing ones are switched over; unlogged=False switches
+    them back to LOGGED; None (default) creates LOGGED tables and leaves
+    existing ones alone. A partitioned parent cannot be UNLOGGED itself; it
+    holds no data. An older, unpartitioned
+    stg_movies is left as it is and a warning is logged.
     """
+    persistence = "UNLOGGED " if unlogged else ""
+
     with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS stg_movies (
+                rank_num          INTEGER,
+                title             TEXT,
+                genre             TEXT,
+                description       TEXT,
+                director          TEXT,
+                actors            TEXT,
+                year              INTEGER,
+                runtime_minutes   INTEGER,
+                rating            DOUBLE PRECISION,
+                votes             INTEGER,
+                revenue_millions  DOUBLE PRECISION,
+                metascore         DOUBLE PRECISION
+            ) PARTITION BY RANGE (year);
+            """
+        )
+
+        if _relkind(cur, "stg_movies") == "p":
+            for name, start, end in _movie_partitions():
+                cur.execute(
+                    f"CREATE {persistence}TABLE IF NOT EXISTS {name} "
+                    f"PARTITION OF stg_movies FOR VALUES FROM ({start}) TO ({end});"
+                )
+            cur.execute(
+                f"CREATE {persistence}TABLE IF NOT EXISTS stg_movies_default "
+                f"PARTITION OF stg_movies DEFAULT;"
+            )
+        else:
+            logger.warning(
+                "stg_movies exists but is not partitioned; leaving it unchanged"
+            )
+
+        cur.execute(
+            f"""
+            CREATE {persistence}TABLE IF NOT EXISTS stg_rejects (
+                id           SERIAL PRIMARY KEY,
+                source_file  TEXT,
+                raw_record   JSONB,
+                error_reason TEXT,
+                created_at   TIMESTAMP DEFAULT NOW()
+            );
+            """
+        )
+
         cur.execute(
             """
             CREATE TABLE IF NOT EXISTS rejects_raw (
@@ -62,5 +168,132 @@ def create_tables(conn):
             """
         )
 
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ingestion_profiles (
+                id           SERIAL PRIMARY KEY,
+                source_file  TEXT,
+                row_count    BIGINT,
+                reject_count BIGINT,
+                profile      JSONB,
+                sketches     JSONB,
+                profiled_at  TIMESTAMPTZ DEFAULT now()
+            );
+            """
+        )
+
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS raw_records (
+                id           BIGSERIAL PRIMARY KEY,
+                source_file  TEXT,
+                record       JSONB,
+                ingested_at  TIMESTAMPTZ DEFAULT now()
+            );
+            """
+        )
+
+        for table, (key, key_type) in ROLLUP_TABLES.items():
+            cur.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    {key}            {key_type} PRIMARY KEY,
+                    movie_count      BIGINT NOT NULL DEFAULT 0,
+                    rating_sum       DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    rating_count     BIGINT NOT NULL DEFAULT 0,
+                    votes_sum        BIGINT NOT NULL DEFAULT 0,
+                    revenue_sum      DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    revenue_count    BIGINT NOT NULL DEFAULT 0,
+                    avg_rating       DOUBLE PRECISION GENERATED ALWAYS AS
+                                     (rating_sum / NULLIF(rating_count, 0)) STORED
+                );
+                """
+            )
+
+        if unlogged is not None:
+            set_staging_persistence(conn, logged=not unlogged)
+        for ddl in SECONDARY_INDEXES.values():
+            cur.execute(ddl)
+
     conn.commit()
-    logger.info("Ensured rejects_raw table exists")
+    logger.info(
+        "Ensured stg_movies (partitioned by year), stg_rejects, rejects_raw, ingestion_profiles, raw_records and rollups exist%s",
+        " (staging UNLOGGED)" if unlogged else "",
+    )
+
+
+def _staging_relations(cur):
+    """Tables that actually hold staging rows (partitions, not the parent)."""
+    cur.execute(
+        """
+        SELECT c.oid::regclass::text, c.relpersistence
+        FROM pg_class c
+        WHERE c.oid = to_regclass('stg_rejects')
+           OR c.oid IN (SELECT inhrelid FROM pg_inherits
+                        WHERE inhparent = to_regclass('stg_movies'))
+           OR (c.oid = to_regclass('stg_movies') AND c.relkind = 'r')
+        ORDER BY 1
+        """
+    )
+    return cur.fetchall()
+
+
+def set_staging_persistence(conn, logged: bool) -> None:
+    """
+    Switch the staging tables to LOGGED or UNLOGGED, touching only those
+    that differ. Going back to LOGGED rewrites the table into WAL.
+    Does not commit.
+    """
+    wanted = "p" if logged else "u"
+    keyword = "LOGGED" if logged else "UNLOGGED"
+    with conn.cursor() as cur:
+        for table, persistence in _staging_relations(cur):
+            if persistence != wanted:
+                cur.execute(f"ALTER TABLE {table} SET {keyword};")
+                logger.info("Set %s %s", table, keyword)
+
+
+def drop_secondary_indexes(conn) -> None:
+    """Drop the SECONDARY_INDEXES (partition indexes go with them)."""
+    with conn.cursor() as cur:
+        for name in SECONDARY_INDEXES:
+            cur.execute(f"DROP INDEX IF EXISTS {name};")
+    conn.commit()
+    logger.info("Dropped secondary indexes: %s", ", ".join(SECONDARY_INDEXES))
+
+
+def rebuild_secondary_indexes(conn) -> None:
+    """Recreate the SECONDARY_INDEXES and refresh planner statistics."""
+    with conn.cursor() as cur:
+        for ddl in SECONDARY_INDEXES.values():
+            cur.execute(ddl)
+    conn.commit()
+    logger.info("Rebuilt secondary indexes: %s", ", ".join(SECONDARY_INDEXES))
+    analyze_staging(conn)
+
+
+def analyze_staging(conn) -> None:
+    with conn.cursor() as cur:
+        for table in STAGING_TABLES:
+            cur.execute(f"ANALYZE {table};")
+    conn.commit()
+    logger.info("Analyzed %s", ", ".join(STAGING_TABLES))
+
+
+@contextmanager
+def bulk_load(conn, enabled: bool = True):
+    """
+    Wrap a large load: drop secondary indexes before it, rebuild them and
+    ANALYZE after it, so rows are not indexed one at a time. The indexes
+    are rebuilt even if the load fails. With enabled=False this is a no-op.
+    """
+    if not enabled:
+        yield
+        return
+
+    drop_secondary_indexes(conn)
+    try:
+        yield
+    finally:
+        conn.rollback()
+        rebuild_secondary_indexes(conn)
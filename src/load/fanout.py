@@ -0,0 +1,640 @@
+# fanout.py
+"""
+Single-pass fan-out of validated batches to every configured sink.
+
+The ingestion loop validates and transforms each batch once and hands it to
+FanOutWriter.write(). Every sink owns a bounded queue and a background
+writer thread, so a slow sink only stalls the producer once its own queue is
+full, while the other sinks keep draining theirs.
+
+Available sinks (enabled in the `sinks:` section of config.yaml):
+  - staging_tables : stg_movies + stg_rejects (+ rollup deltas, see rollups.py),
+                     committed every commit_chunk_size rows
+  - rejects_raw    : rejects_raw audit table (replaces the second pass
+                     through load_rejects_to_db.py), committed with the
+                     same chunks as staging_tables
+  - reject_csv     : paths.rejected_csv
+  - clean_csv      : CSV copy of the clean rows
+  - parquet        : Parquet copy of the clean rows (needs pyarrow)
+  - data_profile   : one-pass column profile -> ingestion_profiles
+
+The file sinks write to `<path>.tmp` and only move it into place when the
+run finishes, so an aborted run leaves no partial file behind.
+"""
+
+from contextlib import ExitStack, nullcontext
+from typing import Any, Dict, List, NamedTuple, Tuple
+import csv
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+
+from src.load.db import get_connection
+from src.load.loaders import (
+    db_reject_record,
+    insert_bisecting,
+    insert_movies,
+    insert_profile,
+    insert_rejects,
+    insert_stg_rejects,
+)
+from src.load.rollups import apply_deltas, compute_deltas, merge_deltas
+from src.transform.data_profile import DatasetProfile, profile_from_config
+from src.transform.transformers import STG_MOVIES_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Columns written to paths.rejected_csv (the layout load_rejects_to_db reads)
+REJECT_CSV_COLUMNS = ("source_file", "rank", "title", "year", "rating", "votes", "error_reason")
+
+_END = object()
+_STOP = object()
+_ABORT = object()
+
+
+class Batch(NamedTuple):
+    """One validated slice of the input, shared read-only by every sink."""
+
+    source_file: str
+    # transformed tuples in STG_MOVIES_COLUMNS order
+    valid: List[tuple]
+    # (raw_record, error_reason) pairs
+    rejects: List[Tuple[Dict[str, Any], str]]
+    # sequence number the batch was cut at (AdaptiveBatchSizer.batches)
+    seq: int | None = None
+
+
+class Sink:
+    """
+    Base class for a fan-out target with its own queue and writer thread.
+
+    Subclasses implement write(batch) and may override open(), finish()
+    (successful end of run, e.g. commit) and abort() (failed run, e.g.
+    rollback). Resources registered on self.resources are closed when the
+    writer thread exits.
+    """
+
+    name = "sink"
+    # True for sinks that write to PostgreSQL (the caller ensures the DDL)
+    needs_db = False
+
+    def __init__(self, queue_size: int = 8):
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._error = None
+        self._drained = threading.Event()
+        self.resources = ExitStack()
+        self.batches = 0
+        # called as on_write(sink name, rows, seconds, batch seq) after every batch
+        self.on_write = None
+        # StageProfiler for write()/finish(), run as stage "sink.<name>"
+        self.profiler = None
+
+    # --- producer side ---------------------------------------------------
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name=f"sink-{self.name}", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, batch: Batch) -> None:
+        """Queue a batch; blocks only while this sink's queue is full."""
+        if self._error is not None:
+            raise RuntimeError(f"sink {self.name} failed") from self._error
+        self._queue.put(batch)
+
+    @property
+    def failed(self) -> bool:
+        return self._error is not None
+
+    def end_input(self) -> None:
+        """Mark the end of input; wait_drained() returns once it is written."""
+        self._queue.put(_END)
+
+    def wait_drained(self) -> None:
+        self._drained.wait()
+
+    def close(self, abort: bool = False) -> None:
+        """Signal end of input, wait for the writer, re-raise its failure."""
+        self._queue.put(_ABORT if abort else _STOP)
+        self._thread.join()
+        if self._error is not None:
+            raise RuntimeError(f"sink {self.name} failed") from self._error
+
+    # --- writer thread ---------------------------------------------------
+
+    def _run(self) -> None:
+        try:
+            with self.resources:
+                # last control item taken off the queue (_STOP or _ABORT)
+                terminal = None
+                try:
+                    self.open()
+                    while True:
+                        item = self._queue.get()
+                        if item is _END:
+                            self._drained.set()
+                            continue
+                        if item is _STOP:
+                            terminal = item
+                            with self._profile():
+                                self.finish()
+                            break
+                        if item is _ABORT:
+                            terminal = item
+                            self.abort()
+                            break
+                        started = time.perf_counter()
+                        with self._profile():
+                            self.write(item)
+                        self.batches += 1
+                        if self.on_write is not None:
+                            self.on_write(
+                                self.name,
+                                len(item.valid) + len(item.rejects),
+                                time.perf_counter() - started,
+                                item.seq,
+                            )
+                except BaseException as exc:
+                    self._error = exc
+                    self._drained.set()
+                    logger.exception("Sink %s failed", self.name)
+                    if terminal is not _ABORT:
+                        self._safe_abort()
+                    # after _STOP/_ABORT nothing else is queued: close() is
+                    # already waiting on join() and re-raises self._error
+                    if terminal is None:
+                        self._drain()
+        except BaseException as exc:
+            # failure while releasing resources
+            if self._error is None:
+                self._error = exc
+                logger.exception("Sink %s failed to close", self.name)
+
+    def _profile(self):
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.stage(f"sink.{self.name}")
+
+    def _safe_abort(self) -> None:
+        try:
+            self.abort()
+        except Exception:
+            logger.exception("Sink %s failed to abort", self.name)
+
+    def _drain(self) -> None:
+        # Keep consuming so the producer never blocks on a dead sink.
+        while self._queue.get() not in (_STOP, _ABORT):
+            pass
+
+    # --- hooks -----------------------------------------------------------
+
+    def open(self) -> None:
+        pass
+
+    def write(self, batch: Batch) -> None:
+        raise NotImplementedError
+
+    def finish(self) -> None:
+        pass
+
+    def abort(self) -> None:
+        pass
+
+
+class StagingTablesSink(Sink):
+    """
+    Clean rows -> stg_movies, rejects -> stg_rejects.
+
+    The transaction is committed every `chunk_size` rows (at batch
+    boundaries; None commits once at the end of the run), so a failure only
+    loses the uncommitted chunk. Each batch is inserted with
+    loaders.insert_bisecting: rows PostgreSQL refuses are isolated and sent
+    to stg_rejects with the database error as error_reason, the rest of the
+    batch is kept. With rollups=True the rollup delta of the rows actually
+    inserted is added up per chunk and merged once, right before the chunk
+    commits (see rollups.py for why).
+    """
+
+    name = "staging_tables"
+    needs_db = True
+
+    def __init__(
+        self,
+        db_config: dict,
+        queue_size: int = 8,
+        rollups: bool = False,
+        chunk_size: int | None = None,
+    ):
+        super().__init__(queue_size)
+        self.db_config = db_config
+        self.rollups = rollups
+        self.chunk_size = chunk_size
+        self.conn = None
+        self.inserted = 0
+        self.rejected = 0
+        self.db_rejected = 0
+        self.committed_inserted = 0
+        self.committed_rejected = 0
+        self.commits = 0
+        self._uncommitted = 0
+        # rollup delta of the open chunk, applied in _commit
+        self._deltas = {}
+
+    def open(self) -> None:
+        self.conn = self.resources.enter_context(get_connection(self.db_config))
+
+    def _insert_valid(self, rows) -> None:
+        insert_movies(self.conn, rows)
+        if self.rollups:
+            merge_deltas(self._deltas, compute_deltas(rows))
+
+    def write(self, batch: Batch) -> None:
+        refused = insert_bisecting(self.conn, batch.valid, self._insert_valid)
+        rejects = list(batch.rejects)
+        rejects.extend((db_reject_record(row), reason) for row, reason in refused)
+
+        unstored = insert_bisecting(
+            self.conn,
+            rejects,
+            lambda part: insert_stg_rejects(self.conn, batch.source_file, part),
+        )
+        for (raw, reason), error in unstored:
+            logger.error("Could not store reject (%s) in stg_rejects: %s", reason, error)
+
+        self.inserted += len(batch.valid) - len(refused)
+        self.rejected += len(rejects) - len(unstored)
+        self.db_rejected += len(refused)
+        self._uncommitted += len(batch.valid) + len(batch.rejects)
+        if self.chunk_size and self._uncommitted >= self.chunk_size:
+            self._commit()
+
+    def _commit(self) -> None:
+        if self._deltas:
+            apply_deltas(self.conn, self._deltas)
+            self._deltas = {}
+        self.conn.commit()
+        self.commits += 1
+        self.committed_inserted = self.inserted
+        self.committed_rejected = self.rejected
+        self._uncommitted = 0
+
+    def finish(self) -> None:
+        self._commit()
+        logger.info(
+            "Committed %d rows to stg_movies and %d rows to stg_rejects "
+            "(%d refused by the database) in %d commits",
+            self.inserted,
+            self.rejected,
+            self.db_rejected,
+            self.commits,
+        )
+
+    def abort(self) -> None:
+        self._deltas = {}
+        if self.conn is not None:
+            self.conn.rollback()
+            logger.warning(
+                "Rolled back the open chunk; %d stg_movies and %d stg_rejects "
+                "rows from earlier chunks stay committed",
+                self.committed_inserted,
+                self.committed_rejected,
+            )
+
+
+class RejectsRawSink(Sink):
+    """
+    Rejects -> rejects_raw audit table.
+
+    Commits after the same batches as StagingTablesSink (every `chunk_size`
+    input rows, counted the same way), so after a failure rejects_raw holds
+    the rejects of exactly the chunks committed to stg_rejects. Like there,
+    a reject PostgreSQL refuses is isolated with insert_bisecting and
+    logged instead of failing the run.
+    """
+
+    name = "rejects_raw"
+    needs_db = True
+
+    def __init__(self, db_config: dict, queue_size: int = 8, chunk_size: int | None = None):
+        super().__init__(queue_size)
+        self.db_config = db_config
+        self.chunk_size = chunk_size
+        self.conn = None
+        self.written = 0
+        self.committed = 0
+        self._uncommitted = 0
+
+    def open(self) -> None:
+        self.conn = self.resources.enter_context(get_connection(self.db_config))
+
+    def write(self, batch: Batch) -> None:
+        if batch.rejects:
+            records = [
+                {"source_file": batch.source_file, "raw_record": raw, "error_reason": reason}
+                for raw, reason in batch.rejects
+            ]
+            unstored = insert_bisecting(
+                self.conn, records, lambda part: insert_rejects(self.conn, part, commit=False)
+            )
+            for record, error in unstored:
+                logger.error(
+                    "Could not store reject (%s) in rejects_raw: %s", record["error_reason"], error
+                )
+            self.written += len(records) - len(unstored)
+        self._uncommitted += len(batch.valid) + len(batch.rejects)
+        if self.chunk_size and self._uncommitted >= self.chunk_size:
+            self._commit()
+
+    def _commit(self) -> None:
+        self.conn.commit()
+        self.committed = self.written
+        self._uncommitted = 0
+
+    def finish(self) -> None:
+        self._commit()
+
+    def abort(self) -> None:
+        if self.conn is not None:
+            self.conn.rollback()
+            logger.warning(
+                "Rolled back the open chunk; %d rejects_raw rows from earlier chunks stay committed",
+                self.committed,
+            )
+
+
+def _temp_path(path: str) -> str:
+    """Sibling temp file the file sinks write to until the run finishes."""
+    return f"{path}.tmp"
+
+
+def _remove_temp(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class _CsvFileSink(Sink):
+    """
+    Shared open/finish/abort handling for the CSV file sinks.
+
+    Rows go to `<path>.tmp`; finish() moves it over `path` with os.replace,
+    abort() deletes it, so a failed run leaves the previous file untouched.
+    With append=True (watch mode) finish() instead appends the temp file's
+    rows to `path`, and the header is only written when `path` is new or
+    empty.
+    """
+
+    def __init__(self, path: str, queue_size: int = 8, append: bool = False):
+        super().__init__(queue_size)
+        self.path = path
+        self.tmp_path = _temp_path(path)
+        self.append = append
+        self.writer = None
+        self._file = None
+
+    def open(self) -> None:
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._file = open(self.tmp_path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self._file, lineterminator="\n")
+        if not (self.append and os.path.exists(self.path) and os.path.getsize(self.path) > 0):
+            self.writer.writerow(self.header)
+
+    def finish(self) -> None:
+        self._file.close()
+        if self.append:
+            with open(self.tmp_path, "rb") as src, open(self.path, "ab") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(self.tmp_path)
+        else:
+            os.replace(self.tmp_path, self.path)
+
+    def abort(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        _remove_temp(self.tmp_path)
+
+
+class RejectCsvSink(_CsvFileSink):
+    """Rejects -> paths.rejected_csv."""
+
+    name = "reject_csv"
+    header = REJECT_CSV_COLUMNS
+
+    def write(self, batch: Batch) -> None:
+        self.writer.writerows(
+            (
+                batch.source_file,
+                raw.get("Rank"),
+                raw.get("Title"),
+                raw.get("Year"),
+                raw.get("Rating"),
+                raw.get("Votes"),
+                reason,
+            )
+            for raw, reason in batch.rejects
+        )
+
+
+class CleanCsvSink(_CsvFileSink):
+    """Clean rows -> CSV file with the stg_movies columns."""
+
+    name = "clean_csv"
+    header = STG_MOVIES_COLUMNS
+
+    def write(self, batch: Batch) -> None:
+        self.writer.writerows(batch.valid)
+
+
+class ParquetSink(Sink):
+    """
+    Clean rows -> Parquet file, one row group per batch. Requires pyarrow.
+    Like the CSV sinks it writes `<path>.tmp` and renames it on finish().
+    """
+
+    name = "parquet"
+
+    def __init__(self, path: str, queue_size: int = 8):
+        super().__init__(queue_size)
+        self.path = path
+        self.tmp_path = _temp_path(path)
+        self.writer = None
+
+    def open(self) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("The parquet sink requires pyarrow (pip install pyarrow)") from exc
+
+        self._pa = pa
+        self.schema = pa.schema(
+            [
+                ("rank_num", pa.int64()),
+                ("title", pa.string()),
+                ("genre", pa.string()),
+                ("description", pa.string()),
+                ("director", pa.string()),
+                ("actors", pa.string()),
+                ("year", pa.int64()),
+                ("runtime_minutes", pa.int64()),
+                ("rating", pa.float64()),
+                ("votes", pa.int64()),
+                ("revenue_millions", pa.float64()),
+                ("metascore", pa.float64()),
+            ]
+        )
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.writer = pq.ParquetWriter(self.tmp_path, self.schema)
+
+    def write(self, batch: Batch) -> None:
+        if not batch.valid:
+            return
+        columns = list(zip(*batch.valid))
+        table = self._pa.Table.from_arrays(
+            [self._pa.array(col, type=field.type) for col, field in zip(columns, self.schema)],
+            schema=self.schema,
+        )
+        self.writer.write_table(table)
+
+    def finish(self) -> None:
+        self.writer.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        _remove_temp(self.tmp_path)
+
+
+class ProfileSink(Sink):
+    """
+    Clean rows -> DatasetProfile, stored as one ingestion_profiles row when
+    the run commits. Replaces the post-load profiling scans of stg_movies.
+    """
+
+    name = "data_profile"
+    needs_db = True
+
+    def __init__(self, db_config: dict, profile: DatasetProfile, queue_size: int = 8):
+        super().__init__(queue_size)
+        self.db_config = db_config
+        self.profile = profile
+        self.source_file = None
+
+    def write(self, batch: Batch) -> None:
+        if self.source_file is None:
+            self.source_file = batch.source_file
+        self.profile.update(batch.valid, rejected=len(batch.rejects))
+
+    def finish(self) -> None:
+        with get_connection(self.db_config) as conn:
+            insert_profile(conn, self.source_file, self.profile)
+            conn.commit()
+
+
+class FanOutWriter:
+    """
+    Deliver each batch to every sink. Use as a context manager: a clean exit
+    finishes (commits) every sink, an exception aborts (rolls back) them.
+    StagingTablesSink and RejectsRawSink commit every commit_chunk_size rows
+    at the same batch boundaries, so an abort only rolls back their open
+    chunk and leaves stg_rejects and rejects_raw in agreement. The profile
+    row and the file outputs are only written when the run finishes.
+
+    Closing is two-phase: every sink first writes out its queue, and only if
+    none of them failed are they told to finish. One failing sink therefore
+    aborts the others: the chunked sinks keep the chunks they had already
+    committed and roll back only the open one, the other sinks write
+    nothing.
+    """
+
+    def __init__(self, sinks: List[Sink], on_write=None, profiler=None):
+        self.sinks = sinks
+        for sink in sinks:
+            # e.g. AdaptiveBatchSizer.observe, fed from every sink's writer thread
+            if on_write is not None:
+                sink.on_write = on_write
+            # cProfile is per thread: each sink profiles its own writes
+            if profiler is not None:
+                sink.profiler = profiler
+
+    def __enter__(self) -> "FanOutWriter":
+        for sink in self.sinks:
+            sink.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close(abort=exc_type is not None)
+
+    def write(self, batch: Batch) -> None:
+        for sink in self.sinks:
+            sink.submit(batch)
+
+    def close(self, abort: bool = False) -> None:
+        """
+        Finish every sink, or abort all of them if `abort` is set or any sink
+        failed. A sink failure is re-raised unless the caller is already
+        aborting because of its own exception.
+        """
+        for sink in self.sinks:
+            sink.end_input()
+        for sink in self.sinks:
+            sink.wait_drained()
+        sink_failed = any(sink.failed for sink in self.sinks)
+
+        errors = []
+        for sink in self.sinks:
+            try:
+                sink.close(abort=abort or sink_failed)
+            except RuntimeError as exc:
+                errors.append(exc)
+        if errors and not abort:
+            raise errors[0]
+
+
+def build_sinks(cfg: dict, append: bool = False) -> List[Sink]:
+    """
+    Create the sinks enabled in the `sinks:` section of config.yaml.
+    append=True makes the file sinks add to existing CSV files instead of
+    replacing them (used by the watch mode, which opens sinks per micro-batch)
+    and leaves out data_profile: the watch mode keeps one profile for its
+    whole run rather than storing one per micro-batch.
+    """
+    sink_cfg = cfg.get("sinks") or {}
+    queue_size = int(sink_cfg.get("queue_size", 8))
+    # shared by the database sinks so they commit after the same batches
+    chunk_size = sink_cfg.get("commit_chunk_size")
+    chunk_size = int(chunk_size) if chunk_size else None
+    sinks = []
+
+    if sink_cfg.get("staging_tables", True):
+        rollups = (cfg.get("rollups") or {}).get("enabled", False)
+        sinks.append(StagingTablesSink(cfg["db"], queue_size, rollups=rollups, chunk_size=chunk_size))
+    if sink_cfg.get("rejects_raw", False):
+        sinks.append(RejectsRawSink(cfg["db"], queue_size, chunk_size=chunk_size))
+    if sink_cfg.get("reject_csv", False):
+        sinks.append(RejectCsvSink(cfg["paths"]["rejected_csv"], queue_size, append=append))
+    if sink_cfg.get("clean_csv"):
+        sinks.append(CleanCsvSink(sink_cfg["clean_csv"], queue_size, append=append))
+    if sink_cfg.get("parquet"):
+        path = sink_cfg["parquet"]
+        if append:
+            # Parquet files cannot be appended to: one part file per call
+            stem, ext = os.path.splitext(path)
+            path = f"{stem}.{time.time_ns()}{ext}"
+        sinks.append(ParquetSink(path, queue_size))
+    if sink_cfg.get("data_profile", False) and not append:
+        sinks.append(ProfileSink(cfg["db"], profile_from_config(cfg), queue_size))
+
+    logger.info("Fan-out sinks: %s", ", ".join(s.name for s in sinks) or "none")
+    return sinks
@@ -1,4 +1,5 @@
 # load_imdb.py
+import argparse
 import csv
 import json
 import os
@@ -11,6 +12,8 @@ from pyspark.sql.types import IntegerType, FloatType
 import logging
 # from validator import validate_movie # We will use Spark-native validation
 from src.Main.logging_config import setup_logging
+from src.load.db import get_connection, create_tables
+from src.Main.profiling import add_profile_arguments, profiler_from_args
 
 """
 IMDB ingestion and export script driven by config.yaml.
@@ -20,6 +23,10 @@ cleaned data into the stg_movies table in PostgreSQL while logging invalid
 rows to both a rejects table and a separate CSV + log file. Also supports
 exporting all cleaned movies from stg_movies into outputs/clean_imdb_movies.csv
 for downstream analysis.
+
+Run with --profile to write per-stage cProfile/tracemalloc output next to
+the configured log file. Spark evaluates lazily, so most of the work shows
+up under the "save" stage.
 """
 
 # Determine the project root (one level up from src/)
@@ -77,26 +84,6 @@ if not os.path.isabs(REJECTED_CSV):
 if not os.path.isabs(LOG_FILE):
     LOG_FILE = os.path.join(PROJECT_ROOT, LOG_FILE)
 
-# --- set up logging to a file ---
-# Re-configure basic config? logging_config.py does basicConfig.
-# But we might need to update the filename if it was relative.
-# logging_config.py reads the config itself.
-# We passed CONFIG_PATH to setup_logging.
-# setup_logging reads config, gets log_file, and does Path(log_file).
-# If log_file in config is "logs/ingestion.log" and we are in "src/", Path("logs/...") will try "src/logs/..." which might be wrong.
-# "logs" is in root.
-# So we need to ensure setup_logging handles paths correctly too?
-# Or just chdir to project root?
-# Changing CWD is risky but often easiest for "run from anywhere" scripts relying on relative paths.
-# Let's try fixing paths safely first.
-
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    force=True # Force update if setup_logging did something wrong?
-)
-logger = logging.getLogger(__name__)
 
 def validate_movie_spark(df):
     """
@@ -247,6 +234,11 @@ def process_and_split(df, path):
     return clean_df, rejects_to_load
 
 def save_to_db_spark(clean_df, rejects_df):
+    # 0. Make sure the project-owned tables exist (partitioned stg_movies etc.)
+    #    so the JDBC writer appends to them instead of creating its own
+    with get_connection(config["db"]) as conn:
+        create_tables(conn, unlogged=(config.get("ddl") or {}).get("unlogged_staging"))
+
     # 1. Define Connection Properties
     jdbc_url = f"jdbc:postgresql://{DB_HOST}:{DB_PORT}/{DB_NAME}"
     connection_properties = {
@@ -300,13 +292,20 @@ def export_clean_movies_to_csv():
     print(f"Exported stg_movies to {output_folder}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Spark ingestion of the IMDB CSV into PostgreSQL.")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    profiler = profiler_from_args(args, CONFIG_PATH)
+
     logger.info("Starting the spark pipeline")
     
     # 1. Load Data
-    raw_data_df = load_imdb_spark()
+    with profiler.stage("read"):
+        raw_data_df = load_imdb_spark()
     
     # 2. Process
-    clean_movies_df, rejected_rows_df = process_and_split(raw_data_df, SOURCE_CSV)
+    with profiler.stage("process"):
+        clean_movies_df, rejected_rows_df = process_and_split(raw_data_df, SOURCE_CSV)
 
     # Show some info
     print("Clean Data Sample:")
@@ -316,7 +315,8 @@ if __name__ == "__main__":
 
     try:
         # 3. Save
-        save_to_db_spark(clean_movies_df, rejected_rows_df)
+        with profiler.stage("save"):
+            save_to_db_spark(clean_movies_df, rejected_rows_df)
 
         final_inserted = clean_movies_df.count()
         final_rejected = rejected_rows_df.count()
@@ -331,4 +331,5 @@ if __name__ == "__main__":
         print(f"Error: {e}")
         # raise e # optional, to fail the job explicitly
         
+    profiler.write()
     spark.stop()
\ No newline at end of file
@@ -9,6 +9,10 @@ Reads the rejected_rows CSV configured in config.yaml, wraps each bad row
 with its source file and error reason, ensures the audit table exists, and
 then bulk-inserts all rejected records into the rejects_raw table using the
 shared DB helpers and loaders.
+
+ingestion_flow.py already writes rejects_raw in the same pass through its
+`rejects_raw` sink; this script is kept for backfilling from an existing
+reject CSV.
 """
 
 from src.load.db import get_connection, create_tables
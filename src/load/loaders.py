@@ -1,26 +1,93 @@
 # loaders.py
-from typing import Iterable, Dict, Any
+from typing import Callable, Iterable, Dict, Any, List, Sequence, Tuple
 import json
 import logging
+import math
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from src.transform.transformers import STG_MOVIES_COLUMNS
 
 logger = logging.getLogger(__name__)
 """
-Loader utilities for rejected IMDB records.
+Loader utilities for IMDB records.
 
-Provides a helper to bulk-insert invalid movie rows into the rejects_raw
-audit table in PostgreSQL, storing the source file, full raw record as JSON,
-and the associated validation error reason, with simple logging for observability.
+Provides helpers to bulk-insert clean movie tuples into stg_movies, invalid
+rows into stg_rejects, and invalid rows into the rejects_raw audit table in
+PostgreSQL, storing the source file, full raw record as JSON, and the
+associated validation error reason, per-run column profiles into
+ingestion_profiles, and non-movie JSON records into raw_records, with
+simple logging for observability.
+
+insert_bisecting() isolates the rows of a batch that PostgreSQL refuses by
+retrying halves under savepoints, so one bad row does not sink the batch.
 """
 
+# Row-level failures worth bisecting. psycopg2 raises ValueError itself for
+# strings with NUL characters; connection and SQL errors are not row-level
+# and are re-raised.
+ROW_ERRORS = (psycopg2.DataError, psycopg2.IntegrityError, ValueError)
+
+STG_MOVIES_INSERT_SQL = (
+    f"INSERT INTO stg_movies ({', '.join(STG_MOVIES_COLUMNS)}) VALUES %s"
+)
 
-def insert_rejects(conn, rejects: Iterable[Dict[str, Any]]) -> None:
+STG_REJECTS_INSERT_SQL = (
+    "INSERT INTO stg_rejects (source_file, raw_record, error_reason) VALUES %s"
+)
+
+
+def insert_movies(conn, rows: Sequence[tuple], page_size: int = 1000) -> int:
+    """
+    Insert transformed movie tuples (STG_MOVIES_COLUMNS order) into stg_movies.
+    Does not commit; the caller owns the transaction.
+    """
+    if not rows:
+        return 0
+    with conn.cursor() as cur:
+        execute_values(cur, STG_MOVIES_INSERT_SQL, rows, page_size=page_size)
+    return len(rows)
+
+
+def insert_stg_rejects(
+    conn,
+    source_file: str,
+    rejects: Sequence[Tuple[Dict[str, Any], str]],
+    page_size: int = 1000,
+) -> int:
+    """
+    Insert (raw_record, error_reason) pairs into stg_rejects. raw_record is
+    passed through jsonb_safe, so a NUL in a rejected field does not make
+    the reject itself undeliverable. Does not commit; the caller owns the
+    transaction.
+    """
+    if not rejects:
+        return 0
+    rows = [(source_file, json.dumps(jsonb_safe(raw)), reason) for raw, reason in rejects]
+    with conn.cursor() as cur:
+        execute_values(
+            cur,
+            STG_REJECTS_INSERT_SQL,
+            rows,
+            template="(%s, %s::jsonb, %s)",
+            page_size=page_size,
+        )
+    return len(rows)
+
+
+def insert_rejects(
+    conn, rejects: Iterable[Dict[str, Any]], commit: bool = True, page_size: int = 1000
+) -> None:
     """
     Insert invalid records into the `rejects_raw` table.
 
     Each reject dict is expected to have:
       - "source_file": str
-      - "raw_record": dict (the original row)
+      - "raw_record": dict (the original row, passed through jsonb_safe)
       - "error_reason": str
+
+    Pass commit=False to leave the transaction open for the caller.
     """
     rejects = list(rejects)
     if not rejects:
@@ -30,20 +97,133 @@ def insert_rejects(conn, rejects: Iterable[Dict[str, Any]]) -> None:
     rows = [
         (
             r.get("source_file"),
-            json.dumps(r.get("raw_record", {})),
+            json.dumps(jsonb_safe(r.get("raw_record", {}))),
             r.get("error_reason", "Unknown error"),
         )
         for r in rejects
     ]
 
     with conn.cursor() as cur:
-        cur.executemany(
+        execute_values(
+            cur,
+            "INSERT INTO rejects_raw (source_file, raw_record, error_reason) VALUES %s",
+            rows,
+            template="(%s, %s::jsonb, %s)",
+            page_size=page_size,
+        )
+
+    if commit:
+        conn.commit()
+    logger.info("Inserted %d rejected rows into rejects_raw table", len(rows))
+
+
+def insert_profile(conn, source_file: str, profile) -> None:
+    """
+    Insert one DatasetProfile (src/transform/data_profile.py) into
+    ingestion_profiles: the readable summary in `profile` and the mergeable
+    state in `sketches`. Does not commit; the caller owns the transaction.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
             """
-            INSERT INTO rejects_raw (source_file, raw_record, error_reason)
-            VALUES (%s, %s, %s);
+            INSERT INTO ingestion_profiles
+                (source_file, row_count, reject_count, profile, sketches)
+            VALUES (%s, %s, %s, %s::jsonb, %s::jsonb);
             """,
+            (
+                source_file,
+                profile.rows,
+                profile.rejected,
+                json.dumps(profile.summary()),
+                json.dumps(profile.to_dict()),
+            ),
+        )
+    logger.info("Stored column profile for %s (%d rows)", source_file, profile.rows)
+
+
+def insert_raw_records(conn, source_file: str, records: Sequence[Any], page_size: int = 1000) -> int:
+    """
+    Insert arbitrary JSON records (e.g. rows of data/customers.json) into
+    raw_records, passed through jsonb_safe (json.loads accepts NaN and
+    \\u0000, JSONB does not). Does not commit; the caller owns the
+    transaction.
+    """
+    if not records:
+        return 0
+    rows = [(source_file, json.dumps(jsonb_safe(record))) for record in records]
+    with conn.cursor() as cur:
+        execute_values(
+            cur,
+            "INSERT INTO raw_records (source_file, record) VALUES %s",
             rows,
+            template="(%s, %s::jsonb)",
+            page_size=page_size,
         )
+    return len(rows)
 
-    conn.commit()
-    logger.info("Inserted %d rejected rows into rejects_raw table", len(rows))
+
+def db_error_reason(exc: Exception) -> str:
+    """One-line error_reason for a row PostgreSQL refused."""
+    message = (getattr(exc, "pgerror", None) or str(exc)).strip()
+    first = message.splitlines()[0] if message else type(exc).__name__
+    return f"Database error: {first.removeprefix('ERROR:').strip()}"
+
+
+def jsonb_safe(value: Any) -> Any:
+    """
+    Copy of a JSON-able value that PostgreSQL accepts as JSONB: NUL
+    characters in strings (keys included) become the text \\x00 and NaN/inf
+    become strings, recursively through dicts and lists.
+    """
+    if isinstance(value, str):
+        return value.replace("\x00", "\\x00")
+    if isinstance(value, float) and not math.isfinite(value):
+        return str(value)
+    if isinstance(value, dict):
+        return {
+            jsonb_safe(key) if isinstance(key, str) else key: jsonb_safe(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [jsonb_safe(item) for item in value]
+    return value
+
+
+def db_reject_record(row: Sequence[Any]) -> Dict[str, Any]:
+    """
+    raw_record for a transformed row PostgreSQL refused: the row as a
+    STG_MOVIES_COLUMNS dict, made storable as JSONB (see jsonb_safe).
+    """
+    return jsonb_safe(dict(zip(STG_MOVIES_COLUMNS, row)))
+
+
+def insert_bisecting(
+    conn, rows: Sequence[Any], insert: Callable[[Sequence[Any]], Any]
+) -> List[Tuple[Any, str]]:
+    """
+    Run insert(rows) under a savepoint. If PostgreSQL refuses it, roll back
+    to the savepoint and retry each half, recursively, down to single rows.
+    Parts that succeed stay in the transaction and are not sent again.
+    Returns the refused rows as (row, db_error_reason) pairs, in input order.
+    Does not commit.
+    """
+    failed = []
+    pending = [rows] if rows else []
+    with conn.cursor() as cur:
+        while pending:
+            part = pending.pop()
+            cur.execute("SAVEPOINT insert_part;")
+            try:
+                insert(part)
+            except ROW_ERRORS as exc:
+                cur.execute("ROLLBACK TO SAVEPOINT insert_part;")
+                if len(part) == 1:
+                    failed.append((part[0], db_error_reason(exc)))
+                else:
+                    mid = len(part) // 2
+                    pending.append(part[mid:])
+                    pending.append(part[:mid])
+            cur.execute("RELEASE SAVEPOINT insert_part;")
+    if failed:
+        logger.warning("Database refused %d of %d rows", len(failed), len(rows))
+    return failed
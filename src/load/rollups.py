@@ -0,0 +1,261 @@
+# rollups.py
+"""
+Incrementally maintained year / genre / director rollups of stg_movies.
+
+Dashboards read rollup_year, rollup_genre and rollup_director (defined in
+db.ROLLUP_TABLES) instead of running GROUP BY over the whole staging table.
+Every table keeps additive measures only (counts and sums; avg_rating is a
+generated column), so a load merges a delta with ON CONFLICT ... DO UPDATE
+in the same transaction as the stg_movies insert, and its cost follows the
+rows loaded rather than the table size.
+
+  - fan-out loads: StagingTablesSink adds up the delta of every batch in a
+    commit chunk (merge_deltas) and applies it once, just before the chunk
+    commits (apply_deltas)
+  - pushdown loads: build_split_sql() chains rollup_ctes() onto its insert
+
+A few hot rows (recent years, common genres) are shared by every loader.
+Each transaction therefore touches the rollup tables exactly once, at its
+end, with tables in a fixed order and keys sorted: concurrent loaders lock
+rollup rows in the same order (no deadlock) and hold those locks only for
+the merge and the commit, not for a whole chunk.
+
+Rows written to stg_movies by other means (e.g. the Spark loader) are not
+counted; use --rebuild afterwards.
+
+Usage (from the project root):
+
+    python -m src.load.rollups            # recompute from stg_movies and diff
+    python -m src.load.rollups --rebuild  # replace the rollups with a fresh recompute
+"""
+
+from typing import Dict, List, Sequence
+import argparse
+import logging
+import sys
+import yaml
+
+from psycopg2.extras import execute_values
+
+from src.load.db import ROLLUP_TABLES, get_connection, create_tables
+from src.Main.logging_config import setup_logging
+from src.transform.transformers import STG_MOVIES_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Measure columns, in table order, with the aggregate that recomputes them
+MEASURES = (
+    ("movie_count", "count(*)"),
+    ("rating_sum", "coalesce(sum(rating), 0)"),
+    ("rating_count", "count(rating)"),
+    ("votes_sum", "coalesce(sum(votes), 0)"),
+    ("revenue_sum", "coalesce(sum(revenue_millions), 0)"),
+    ("revenue_count", "count(revenue_millions)"),
+)
+MEASURE_COLUMNS = tuple(name for name, _ in MEASURES)
+
+# Sums are compared with a relative tolerance: the loader and a recompute
+# add the same floats in a different order.
+FLOAT_TOLERANCE = 1e-9
+
+_COL = {name: i for i, name in enumerate(STG_MOVIES_COLUMNS)}
+
+
+def _key_expr(key: str) -> str:
+    # year rows without a year are skipped; text keys fold NULL into ''
+    return key if key == "year" else f"coalesce({key}, '')"
+
+
+def _key_value(key: str, value):
+    if key == "year" or value is not None:
+        return value
+    return ""
+
+
+def compute_deltas(rows: Sequence[tuple]) -> Dict[str, Dict[object, list]]:
+    """
+    Per-table {key: [measures in MEASURE_COLUMNS order]} for a batch of
+    transformed tuples (STG_MOVIES_COLUMNS order).
+    """
+    rating_i, votes_i, revenue_i = _COL["rating"], _COL["votes"], _COL["revenue_millions"]
+    deltas = {}
+    for table, (key, _) in ROLLUP_TABLES.items():
+        key_i = _COL[key]
+        acc = {}
+        for row in rows:
+            k = _key_value(key, row[key_i])
+            if k is None:
+                continue
+            m = acc.get(k)
+            if m is None:
+                m = acc[k] = [0, 0.0, 0, 0, 0.0, 0]
+            m[0] += 1
+            if row[rating_i] is not None:
+                m[1] += row[rating_i]
+                m[2] += 1
+            if row[votes_i] is not None:
+                m[3] += row[votes_i]
+            if row[revenue_i] is not None:
+                m[4] += row[revenue_i]
+                m[5] += 1
+        deltas[table] = acc
+    return deltas
+
+
+def _upsert_clause(table: str) -> str:
+    key = ROLLUP_TABLES[table][0]
+    updates = ", ".join(f"{c} = {table}.{c} + EXCLUDED.{c}" for c in MEASURE_COLUMNS)
+    return f"ON CONFLICT ({key}) DO UPDATE SET {updates}"
+
+
+def _insert_columns(table: str) -> str:
+    return ", ".join((ROLLUP_TABLES[table][0],) + MEASURE_COLUMNS)
+
+
+def _aggregate_sql(table: str, source: str) -> str:
+    """SELECT of the rollup rows for `table` computed from `source`."""
+    key = ROLLUP_TABLES[table][0]
+    measures = ", ".join(f"{expr} AS {name}" for name, expr in MEASURES)
+    where = f" WHERE {key} IS NOT NULL" if key == "year" else ""
+    return (
+        f"SELECT {_key_expr(key)} AS {key}, {measures} "
+        f"FROM {source}{where} GROUP BY 1"
+    )
+
+
+def merge_deltas(into: Dict[str, Dict[object, list]], deltas: Dict[str, Dict[object, list]]) -> None:
+    """Add `deltas` (as from compute_deltas) into the accumulator `into`."""
+    for table, acc in deltas.items():
+        target = into.setdefault(table, {})
+        for key, measures in acc.items():
+            m = target.get(key)
+            if m is None:
+                target[key] = list(measures)
+            else:
+                for i, value in enumerate(measures):
+                    m[i] += value
+
+
+def apply_deltas(conn, deltas: Dict[str, Dict[object, list]]) -> None:
+    """
+    Merge precomputed deltas into the rollup tables, table by table in
+    ROLLUP_TABLES order with keys sorted. Only a transaction that calls this
+    once, right before committing, gets the lock order described in the
+    module docstring. Does not commit.
+    """
+    with conn.cursor() as cur:
+        for table in ROLLUP_TABLES:
+            acc = deltas.get(table)
+            if not acc:
+                continue
+            execute_values(
+                cur,
+                f"INSERT INTO {table} ({_insert_columns(table)}) VALUES %s {_upsert_clause(table)}",
+                [(k, *m) for k, m in sorted(acc.items())],
+            )
+
+
+def apply_rollup_deltas(conn, rows: Sequence[tuple]) -> None:
+    """
+    Merge the rollup delta of `rows` into the rollup tables (see
+    apply_deltas). Does not commit; call it in the transaction that inserts
+    `rows`, as its last statement before the commit.
+    """
+    if rows:
+        apply_deltas(conn, compute_deltas(rows))
+
+
+def rollup_ctes(source: str) -> str:
+    """
+    Data-modifying CTEs (comma-prefixed) that merge the rollup delta of the
+    rows in CTE `source` (which must expose the stg_movies columns).
+    """
+    return "".join(
+        f""",
+    {table}_delta AS (
+      INSERT INTO {table} ({_insert_columns(table)})
+      {_aggregate_sql(table, source)} ORDER BY 1
+      {_upsert_clause(table)}
+    )"""
+        for table in ROLLUP_TABLES
+    )
+
+
+def rebuild_rollups(conn) -> None:
+    """Recompute every rollup table from stg_movies in one transaction."""
+    with conn.cursor() as cur:
+        # keep loaders out while the rollups are replaced
+        cur.execute("LOCK TABLE stg_movies IN SHARE MODE;")
+        for table in ROLLUP_TABLES:
+            cur.execute(f"TRUNCATE {table};")
+            cur.execute(
+                f"INSERT INTO {table} ({_insert_columns(table)}) "
+                f"{_aggregate_sql(table, 'stg_movies')};"
+            )
+    conn.commit()
+    logger.info("Rebuilt rollups: %s", ", ".join(ROLLUP_TABLES))
+
+
+def verify_rollups(conn) -> List[tuple]:
+    """
+    Recompute the rollups from stg_movies and diff them against the stored
+    tables. Returns (table, key, recomputed measures, stored measures) for
+    every key that is missing on either side or differs.
+    """
+    diffs = []
+    with conn.cursor() as cur:
+        for table, (key, _) in ROLLUP_TABLES.items():
+            same = " AND ".join(
+                f"(f.{c} = r.{c} OR abs(f.{c} - r.{c}) <= {FLOAT_TOLERANCE} "
+                f"* greatest(abs(f.{c}), abs(r.{c}), 1))"
+                if c.endswith("_sum")
+                else f"f.{c} = r.{c}"
+                for c in MEASURE_COLUMNS
+            )
+            fresh = ", ".join(f"f.{c}" for c in MEASURE_COLUMNS)
+            stored = ", ".join(f"r.{c}" for c in MEASURE_COLUMNS)
+            cur.execute(
+                f"""
+                WITH f AS ({_aggregate_sql(table, 'stg_movies')})
+                SELECT coalesce(f.{key}, r.{key}), ARRAY[{fresh}]::float8[], ARRAY[{stored}]::float8[]
+                FROM f FULL OUTER JOIN {table} r ON r.{key} = f.{key}
+                WHERE f.{key} IS NULL OR r.{key} IS NULL OR NOT ({same})
+                ORDER BY 1
+                """
+            )
+            for k, fresh_row, stored_row in cur.fetchall():
+                diffs.append((table, k, fresh_row, stored_row))
+    conn.rollback()
+
+    if diffs:
+        logger.warning("Rollup verification found %d differing keys", len(diffs))
+    else:
+        logger.info("Rollups match stg_movies")
+    return diffs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify or rebuild the stg_movies rollup tables.")
+    parser.add_argument("--config", default="config/config.yaml")
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="replace the rollups with a recompute from stg_movies instead of diffing",
+    )
+    args = parser.parse_args()
+
+    setup_logging(args.config)
+    with open(args.config, "r") as f:
+        cfg = yaml.safe_load(f)
+
+    with get_connection(cfg["db"]) as conn:
+        create_tables(conn)
+        if args.rebuild:
+            rebuild_rollups(conn)
+            sys.exit(0)
+        diffs = verify_rollups(conn)
+
+    for table, key, fresh, stored in diffs:
+        print(f"{table} {key!r}: recomputed={fresh} stored={stored}")
+    print(f"{len(diffs)} differing keys")
+    sys.exit(1 if diffs else 0)
@@ -5,10 +5,27 @@ Utility module for reading the IMDB movie CSV dataset.
 Provides functions that open the CSV file and return each movie row as a
 dictionary keyed by the column names (e.g., Title, Genre, Rating, Revenue),
 using csv.DictReader for convenient downstream validation and loading.
+
+For large uncompressed files, MmapCsv maps the file into memory, indexes
+row boundaries once, and decodes only the fields a stage asks for.
+
+read_json_records reads JSON array or NDJSON record files (e.g.
+data/customers.json), and read_new_records reads only what was appended to
+a CSV / JSON file since the last call, for the watch mode.
 """
 
-from typing import Iterator, Dict
+from array import array
+from bisect import bisect_left
+from typing import Any, Iterator, Dict, List, Optional, Sequence, Tuple
 import csv
+import io
+import json
+import logging
+import mmap
+import os
+import sys
+
+logger = logging.getLogger(__name__)
 
 
 def read_imdb_csv(path: str):
@@ -49,3 +66,433 @@ def read_imdb_csv(csv_path: str) -> Iterator[Dict[str, str]]:
         for row in reader:
             # Each row is already a dict from column name -> string value
             yield row
+
+
+# ---------------------------------------------------------------------------
+# Memory-mapped CSV scanning
+# ---------------------------------------------------------------------------
+
+_QUOTE = ord('"')
+_COMMA = ord(",")
+_CR = ord("\r")
+
+
+def _iter_row_ends(buf, start: int, end: int) -> Iterator[int]:
+    """
+    Yield the offset of every newline in buf[start:end] that ends a CSV row.
+
+    Quote handling follows the csv module: a quote only opens a quoted field
+    when it is the first byte of a field, and inside a quoted field "" is an
+    escaped quote. A stray quote inside an unquoted field (5'10" tall) is
+    plain data and does not hide the newlines after it.
+    """
+    pos = row_start = start
+    while pos < end:
+        nl = buf.find(b"\n", pos, end)
+        stop = end if nl == -1 else nl
+        q = buf.find(b'"', pos, stop)
+        while q != -1 and not (q == row_start or buf[q - 1] == _COMMA):
+            q = buf.find(b'"', q + 1, stop)
+
+        if q == -1:
+            if nl == -1:
+                return
+            yield nl
+            row_start = pos = nl + 1
+            continue
+
+        # quoted field: skip to its closing quote, newlines included
+        pos = q + 1
+        while True:
+            close = buf.find(b'"', pos, end)
+            if close == -1:
+                return
+            if close + 1 < end and buf[close + 1] == _QUOTE:
+                pos = close + 2
+                continue
+            pos = close + 1
+            break
+
+
+def index_row_boundaries(buf, start: int = 0, end: Optional[int] = None) -> Tuple[array, array]:
+    """
+    Scan a bytes-like buffer for CSV row boundaries.
+
+    Newlines inside quoted fields do not end a row, so the scan tracks quote
+    state (see _iter_row_ends) while jumping between quote and newline bytes
+    with find(). Blank lines are skipped, like csv.DictReader does.
+
+    Returns
+    -------
+    (starts, ends) : Tuple[array, array]
+        Byte offsets of each row; `ends` excludes the line terminator.
+    """
+    if end is None:
+        end = len(buf)
+
+    starts = array("Q")
+    ends = array("Q")
+
+    def _record(row_start: int, row_end: int) -> None:
+        if row_end > row_start and buf[row_end - 1] == _CR:
+            row_end -= 1
+        if row_end > row_start:
+            starts.append(row_start)
+            ends.append(row_end)
+
+    row_start = start
+    for nl in _iter_row_ends(buf, start, end):
+        _record(row_start, nl)
+        row_start = nl + 1
+
+    if row_start < end:
+        _record(row_start, end)
+
+    return starts, ends
+
+
+def _field_spans(buf, start: int, end: int, max_fields: int) -> List[Tuple[int, int, bool]]:
+    """
+    Split one row into at most `max_fields` (start, end, quoted) spans.
+
+    Scanning stops as soon as the last wanted field is found, so fields to the
+    right of it are never touched.
+    """
+    spans = []
+    pos = start
+    while len(spans) < max_fields:
+        if pos < end and buf[pos] == _QUOTE:
+            field_start = pos + 1
+            q = field_start
+            while True:
+                q = buf.find(b'"', q, end)
+                if q == -1:
+                    q = end
+                    break
+                if q + 1 < end and buf[q + 1] == _QUOTE:
+                    q += 2
+                    continue
+                break
+            spans.append((field_start, q, True))
+            comma = buf.find(b",", q, end)
+        else:
+            comma = buf.find(b",", pos, end)
+            spans.append((pos, end if comma == -1 else comma, False))
+
+        if comma == -1:
+            break
+        pos = comma + 1
+        if pos == end:
+            # trailing comma -> one more empty field
+            if len(spans) < max_fields:
+                spans.append((end, end, False))
+            break
+    return spans
+
+
+class MmapCsv:
+    """
+    Zero-copy, memory-mapped reader for uncompressed local CSV files.
+
+    The file is mapped once and scanned for row boundaries (see
+    index_row_boundaries). Rows and contiguous batches of rows are handed out
+    as memoryview slices over the mapping, and only the fields a caller asks
+    for are decoded into Python strings.
+
+    Views returned by row_view/batch_view must be released (or dropped)
+    before close(), otherwise the mapping cannot be unmapped.
+
+    Example
+    -------
+        with MmapCsv("data/imdb_movie_dataset.csv") as csv_map:
+            for row in csv_map.iter_rows(fields=["Title", "Rating"]):
+                ...
+    """
+
+    def __init__(self, path: str, encoding: str = "utf-8",
+                 boundaries: Optional[Tuple[array, array]] = None):
+        self.path = path
+        self.encoding = encoding
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size == 0:
+            self._mm = None
+            self._buf = b""
+        else:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._buf = self._mm
+        self._view = memoryview(self._buf)
+
+        if boundaries is None:
+            boundaries = index_row_boundaries(self._buf)
+        starts, ends = boundaries
+        self._starts = starts
+        self._ends = ends
+
+        if len(starts) == 0:
+            self.header = []
+        else:
+            header_spans = _field_spans(self._buf, starts[0], ends[0], sys.maxsize)
+            self.header = [self._decode(s, e, quoted) for s, e, quoted in header_spans]
+        self._field_pos = {name: i for i, name in enumerate(self.header)}
+
+    # --- lifecycle -------------------------------------------------------
+
+    def close(self) -> None:
+        self._view.release()
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def __enter__(self) -> "MmapCsv":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- boundary index --------------------------------------------------
+
+    @property
+    def boundaries(self) -> Tuple[array, array]:
+        """The (starts, ends) index, including the header row at position 0."""
+        return self._starts, self._ends
+
+    def __len__(self) -> int:
+        """Number of data rows (header excluded)."""
+        return max(len(self._starts) - 1, 0)
+
+    def shard(self, n: int) -> List[Tuple[int, int]]:
+        """
+        Split the data rows into `n` contiguous (row_start, row_stop) ranges of
+        roughly equal byte size, reusing the boundary index. Each range can be
+        handed to a worker, which opens its own MmapCsv with `boundaries=` and
+        calls iter_rows(start=..., stop=...).
+        """
+        total = len(self)
+        if total == 0 or n <= 1:
+            return [(0, total)]
+
+        first = self._starts[1]
+        last = self._ends[-1]
+        step = (last - first) / n
+        cuts = [0]
+        for k in range(1, n):
+            # bisect_left over starts[1:] without copying the array
+            row = bisect_left(self._starts, first + step * k, 1) - 1
+            if row > cuts[-1]:
+                cuts.append(row)
+        cuts.append(total)
+        return list(zip(cuts[:-1], cuts[1:]))
+
+    # --- zero-copy access ------------------------------------------------
+
+    def row_view(self, i: int) -> memoryview:
+        """Raw bytes of data row `i`, without the line terminator."""
+        return self._view[self._starts[i + 1]:self._ends[i + 1]]
+
+    def batch_view(self, start: int, stop: int) -> memoryview:
+        """Raw bytes covering data rows [start, stop), terminators included."""
+        if stop <= start:
+            return self._view[0:0]
+        return self._view[self._starts[start + 1]:self._ends[stop]]
+
+    # --- decoding --------------------------------------------------------
+
+    def _decode(self, start: int, end: int, quoted: bool) -> str:
+        text = str(self._view[start:end], self.encoding)
+        if quoted and '""' in text:
+            text = text.replace('""', '"')
+        return text
+
+    def get_fields(self, i: int, fields: Optional[Sequence[str]] = None) -> Dict[str, Optional[str]]:
+        """
+        Decode the requested fields of data row `i` into a dict.
+
+        Missing trailing fields come back as None, matching csv.DictReader.
+        """
+        if fields is None:
+            fields = self.header
+        positions = [self._field_pos[name] for name in fields]
+        max_pos = max(positions) + 1 if positions else 0
+        spans = _field_spans(self._buf, self._starts[i + 1], self._ends[i + 1], max_pos)
+
+        row = {}
+        for name, pos in zip(fields, positions):
+            if pos < len(spans):
+                row[name] = self._decode(*spans[pos])
+            else:
+                row[name] = None
+        return row
+
+    def iter_rows(self, fields: Optional[Sequence[str]] = None,
+                  start: int = 0, stop: Optional[int] = None) -> Iterator[Dict[str, Optional[str]]]:
+        """Yield decoded dicts for data rows [start, stop)."""
+        if stop is None:
+            stop = len(self)
+        for i in range(start, stop):
+            yield self.get_fields(i, fields)
+
+
+def read_movies_mmap(path: str, fields: Optional[Sequence[str]] = None) -> Iterator[Dict[str, Optional[str]]]:
+    """
+    Memory-mapped counterpart of read_imdb_csv for uncompressed local files.
+
+    Yields one dict per movie row, decoding only `fields` (all columns when
+    omitted).
+    """
+    with MmapCsv(path) as csv_map:
+        yield from csv_map.iter_rows(fields)
+
+
+# ---------------------------------------------------------------------------
+# JSON sources and incremental (offset-based) reads
+# ---------------------------------------------------------------------------
+
+CSV_SUFFIXES = (".csv",)
+JSON_SUFFIXES = (".json", ".ndjson", ".jsonl")
+
+
+def read_json_records(path: str) -> List[Any]:
+    """
+    Read a JSON record file: either one JSON array of records
+    (e.g. data/customers.json) or NDJSON, one record per line.
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        records = json.loads(text)
+        if not isinstance(records, list):
+            raise ValueError(f"{path} is not a JSON array")
+        return records
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def _json_layout(path: str) -> str:
+    """'array' for a JSON array document, 'ndjson' otherwise."""
+    if not path.endswith(".json"):
+        return "ndjson"
+    with open(path, "rb") as f:
+        head = f.read(4096).lstrip()
+    return "array" if head.startswith(b"[") else "ndjson"
+
+
+def _complete_csv_prefix(buf: bytes) -> int:
+    """
+    Length of the leading run of complete CSV records: up to the last
+    newline outside a quoted field, with quotes tracked as the csv module
+    does (see _iter_row_ends).
+    """
+    cut = 0
+    for nl in _iter_row_ends(buf, 0, len(buf)):
+        cut = nl + 1
+    return cut
+
+
+def _read_tail(path: str, offset: int, max_bytes: int, limit: int, complete) -> Tuple[bytes, int]:
+    """
+    Bytes from `offset` up to the last complete record, growing the read if
+    a single record is larger than max_bytes, but not past `limit` bytes.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        buf = f.read(max_bytes)
+        while True:
+            cut = complete(buf)
+            if cut or len(buf) < max_bytes or len(buf) >= limit:
+                return buf[:cut], cut
+            more = f.read(max_bytes)
+            if not more:
+                return buf[:cut], cut
+            buf += more
+            max_bytes *= 2
+
+
+def read_new_records(
+    path: str,
+    state: Optional[Dict[str, Any]] = None,
+    max_bytes: int = 8 << 20,
+    max_record_bytes: int = 64 << 20,
+) -> Tuple[List[Any], Dict[str, Any]]:
+    """
+    Read the records appended to `path` since `state` (as returned by the
+    previous call; None or {} to start from the beginning).
+
+    Only complete records are returned: a CSV row or NDJSON line still
+    being written stays for the next call, and a JSON array is read once it
+    parses. CSV and NDJSON files are tracked by byte offset; a replaced
+    (new inode) or truncated file is read again from the start. JSON arrays
+    can only grow by being rewritten, so they are tracked by the number of
+    records already returned and start over only when the array shrinks.
+
+    If more than max_record_bytes follow the offset without completing a
+    record (e.g. a quote that is never closed), the read is stalled: a
+    warning is logged once and the offset is kept in state["stalled_at"]
+    until the file is fixed or replaced.
+
+    Returns (records, new_state); CSV rows are dicts as from csv.DictReader.
+    At most about max_bytes are read per call.
+    """
+    st = os.stat(path)
+    state = dict(state or {})
+    if path.endswith(JSON_SUFFIXES) and _json_layout(path) == "array":
+        return _read_new_array_records(path, st, state)
+
+    if state.get("inode") != st.st_ino or st.st_size < state.get("offset", 0):
+        state = {"inode": st.st_ino, "offset": 0}
+    offset = state["offset"]
+    if st.st_size == offset:
+        return [], state
+
+    is_csv = path.endswith(CSV_SUFFIXES)
+    complete = _complete_csv_prefix if is_csv else (lambda b: b.rfind(b"\n") + 1)
+    buf, cut = _read_tail(path, offset, max_bytes, max_record_bytes, complete)
+    if not cut:
+        pending = st.st_size - offset
+        if pending > max_record_bytes and state.get("stalled_at") != offset:
+            logger.warning(
+                "No complete record in the %d bytes after offset %d of %s; "
+                "reading is stalled until the file is fixed (unclosed quote?)",
+                pending,
+                offset,
+                path,
+            )
+            state["stalled_at"] = offset
+        return [], state
+    state.pop("stalled_at", None)
+
+    if is_csv:
+        # without a saved header this is the start of the file: DictReader
+        # takes the header from the first record
+        reader = csv.DictReader(io.StringIO(buf.decode("utf-8"), newline=""), fieldnames=state.get("header"))
+        records = list(reader)
+        state.update(offset=offset + cut, header=reader.fieldnames)
+        return records, state
+
+    records = []
+    for line in buf.decode("utf-8").splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            logger.warning("Skipping malformed JSON line in %s: %.80s", path, line)
+    state["offset"] = offset + cut
+    return records, state
+
+
+def _read_new_array_records(path: str, st, state: Dict[str, Any]) -> Tuple[List[Any], Dict[str, Any]]:
+    if state.get("inode") == st.st_ino and state.get("offset") == st.st_size and "records" in state:
+        return [], state
+    try:
+        with open(path, encoding="utf-8") as f:
+            records = json.load(f)
+    except ValueError:
+        # still being written
+        return [], state
+    if not isinstance(records, list):
+        raise ValueError(f"{path} is not a JSON array")
+    done = state.get("records", 0)
+    if len(records) < done:
+        done = 0
+    return records[done:], {"inode": st.st_ino, "offset": st.st_size, "records": len(records)}
@@ -0,0 +1,414 @@
+# data_profile.py
+"""
+One-pass, mergeable column profiles computed while rows stream through the
+ingestion pipeline, replacing the post-load full-table scans over stg_movies.
+
+Every column gets row, null and empty-string counts plus min/max. Columns
+listed in `distinct` also get a HyperLogLog distinct-count estimate and
+columns listed in `quantiles` a t-digest for approximate quantiles.
+
+All state is mergeable: profiles built by parallel workers or over separate
+batches combine with DatasetProfile.merge() (or from_dict() on the
+serialised form) into the profile of the whole input. HyperLogLog merges
+are exact; t-digest merges stay within the digest's usual error.
+
+Pure Python, no extra dependencies. Hashing uses blake2b rather than the
+built-in hash() so sketches built in different processes can be merged.
+"""
+
+from hashlib import blake2b
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import base64
+import bisect
+import math
+
+from src.transform.transformers import STG_MOVIES_COLUMNS
+
+DEFAULT_DISTINCT = ("director", "genre")
+DEFAULT_QUANTILES = ("rating", "votes", "revenue_millions")
+REPORTED_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter with 2**precision one-byte registers
+    (precision 12 -> 4 KiB, ~1.6% standard error). Linear counting is used
+    for small cardinalities.
+    """
+
+    def __init__(self, precision: int = 12):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+
+    def add(self, value: Any) -> None:
+        x = int.from_bytes(blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "big")
+        index = x >> (64 - self.precision)
+        rest = x & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[Any]) -> None:
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("cannot merge HyperLogLogs with different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self) -> int:
+        m = self.m
+        if m >= 128:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[m]
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+    def to_dict(self) -> dict:
+        return {
+            "precision": self.precision,
+            "registers": base64.b64encode(bytes(self.registers)).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "HyperLogLog":
+        hll = cls(data["precision"])
+        hll.registers = bytearray(base64.b64decode(data["registers"]))
+        return hll
+
+
+class TDigest:
+    """
+    Merging t-digest (Dunning) for streaming quantiles. Values are buffered
+    and folded into at most ~compression centroids using the arcsine scale
+    function, which keeps the tails more accurate than the middle.
+    """
+
+    def __init__(self, compression: float = 100):
+        self.compression = compression
+        self.means: List[float] = []
+        self.weights: List[float] = []
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer: List[float] = []
+        self._buffer_size = int(5 * compression)
+
+    def add(self, value: float) -> None:
+        self._buffer.append(value)
+        if len(self._buffer) >= self._buffer_size:
+            self._compress()
+
+    def update(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "TDigest") -> None:
+        other._compress()
+        if not other.means:
+            return
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(list(zip(other.means, other.weights)))
+
+    def _q_limit(self, q: float) -> float:
+        # Largest q reachable from q with one unit of k (k1 scale function)
+        k = self.compression / (2 * math.pi) * math.asin(2 * q - 1) + 1
+        if k >= self.compression / 4:
+            return 1.0
+        return (1 + math.sin(2 * math.pi * k / self.compression)) / 2
+
+    def _compress(self, extra=()) -> None:
+        if not self._buffer and not extra:
+            return
+        items = list(zip(self.means, self.weights))
+        items.extend((v, 1.0) for v in self._buffer)
+        items.extend(extra)
+        self._buffer = []
+        items.sort()
+
+        total = sum(w for _, w in items)
+        self.min = min(self.min, items[0][0])
+        self.max = max(self.max, items[-1][0])
+
+        means, weights = [], []
+        cur_mean, cur_weight = items[0]
+        done = 0.0
+        limit = total * self._q_limit(0.0)
+        for mean, weight in items[1:]:
+            if done + cur_weight + weight <= limit:
+                cur_weight += weight
+                cur_mean += (mean - cur_mean) * weight / cur_weight
+            else:
+                means.append(cur_mean)
+                weights.append(cur_weight)
+                done += cur_weight
+                limit = total * self._q_limit(done / total)
+                cur_mean, cur_weight = mean, weight
+        means.append(cur_mean)
+        weights.append(cur_weight)
+
+        self.means, self.weights, self.count = means, weights, total
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate q-quantile (0 <= q <= 1), None if nothing was added."""
+        self._compress()
+        if not self.means:
+            return None
+        if len(self.means) == 1 or q <= 0:
+            return self.min if q <= 0 else self.means[0]
+        if q >= 1:
+            return self.max
+
+        target = q * self.count
+        # centroid centres in cumulative weight
+        centres = []
+        cumulative = 0.0
+        for w in self.weights:
+            centres.append(cumulative + w / 2)
+            cumulative += w
+
+        if target <= centres[0]:
+            return _lerp(0.0, self.min, centres[0], self.means[0], target)
+        if target >= centres[-1]:
+            return _lerp(centres[-1], self.means[-1], self.count, self.max, target)
+        i = bisect.bisect_right(centres, target)
+        return _lerp(centres[i - 1], self.means[i - 1], centres[i], self.means[i], target)
+
+    def to_dict(self) -> dict:
+        self._compress()
+        return {
+            "compression": self.compression,
+            "means": self.means,
+            "weights": self.weights,
+            "min": self.min if self.means else None,
+            "max": self.max if self.means else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TDigest":
+        digest = cls(data["compression"])
+        digest.means = list(data["means"])
+        digest.weights = list(data["weights"])
+        digest.count = float(sum(digest.weights))
+        if digest.means:
+            digest.min = data["min"]
+            digest.max = data["max"]
+        return digest
+
+
+def _lerp(x0, y0, x1, y1, x):
+    if x1 == x0:
+        return y0
+    return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+
+
+class ColumnProfile:
+    """Counts, min/max and optional sketches for a single column."""
+
+    def __init__(
+        self,
+        name: str,
+        distinct: bool = False,
+        quantiles: bool = False,
+        hll_precision: int = 12,
+        compression: float = 100,
+    ):
+        self.name = name
+        self.count = 0
+        self.nulls = 0
+        self.empties = 0
+        # NaN / +-inf: counted here, kept out of min/max and the digest
+        self.non_finite = 0
+        self.min = None
+        self.max = None
+        self.hll = HyperLogLog(hll_precision) if distinct else None
+        self.digest = TDigest(compression) if quantiles else None
+
+    def update(self, values: Sequence[Any]) -> None:
+        self.count += len(values)
+        present = []
+        for v in values:
+            if v is None:
+                self.nulls += 1
+            elif v == "":
+                self.empties += 1
+            elif isinstance(v, float) and not math.isfinite(v):
+                self.non_finite += 1
+            else:
+                present.append(v)
+        if not present:
+            return
+
+        low, high = min(present), max(present)
+        if self.min is None or low < self.min:
+            self.min = low
+        if self.max is None or high > self.max:
+            self.max = high
+        if self.hll is not None:
+            self.hll.update(present)
+        if self.digest is not None:
+            self.digest.update(present)
+
+    def merge(self, other: "ColumnProfile") -> None:
+        self.count += other.count
+        self.nulls += other.nulls
+        self.empties += other.empties
+        self.non_finite += other.non_finite
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        if self.hll is not None and other.hll is not None:
+            self.hll.merge(other.hll)
+        if self.digest is not None and other.digest is not None:
+            self.digest.merge(other.digest)
+
+    def summary(self) -> dict:
+        """Plain values for reports and the `profile` JSONB column."""
+        out = {
+            "count": self.count,
+            "nulls": self.nulls,
+            "empties": self.empties,
+            "null_rate": self.nulls / self.count if self.count else None,
+            "non_finite": self.non_finite,
+            "min": self.min,
+            "max": self.max,
+        }
+        if self.hll is not None:
+            out["distinct_estimate"] = self.hll.estimate()
+        if self.digest is not None:
+            out["quantiles"] = {
+                str(q): self.digest.quantile(q) for q in REPORTED_QUANTILES
+            }
+        return out
+
+    def sketches(self) -> dict:
+        out = {}
+        if self.hll is not None:
+            out["hll"] = self.hll.to_dict()
+        if self.digest is not None:
+            out["tdigest"] = self.digest.to_dict()
+        return out
+
+
+class DatasetProfile:
+    """
+    Profile of a stream of transformed rows (tuples in `columns` order),
+    plus the number of rejected rows seen alongside them.
+    """
+
+    def __init__(
+        self,
+        columns: Sequence[str] = STG_MOVIES_COLUMNS,
+        distinct: Iterable[str] = DEFAULT_DISTINCT,
+        quantiles: Iterable[str] = DEFAULT_QUANTILES,
+        hll_precision: int = 12,
+        compression: float = 100,
+    ):
+        distinct, quantiles = set(distinct), set(quantiles)
+        unknown = (distinct | quantiles) - set(columns)
+        if unknown:
+            raise ValueError(f"Unknown profile columns: {sorted(unknown)}")
+
+        self.hll_precision = hll_precision
+        self.compression = compression
+        self.columns = [
+            ColumnProfile(
+                name,
+                distinct=name in distinct,
+                quantiles=name in quantiles,
+                hll_precision=hll_precision,
+                compression=compression,
+            )
+            for name in columns
+        ]
+        self.rows = 0
+        self.rejected = 0
+
+    def update(self, rows: Sequence[tuple], rejected: int = 0) -> None:
+        """Add one batch; each column is scanned once, column-wise."""
+        self.rows += len(rows)
+        self.rejected += rejected
+        if not rows:
+            return
+        for column, values in zip(self.columns, zip(*rows)):
+            column.update(values)
+
+    def merge(self, other: "DatasetProfile") -> "DatasetProfile":
+        if [c.name for c in other.columns] != [c.name for c in self.columns]:
+            raise ValueError("cannot merge profiles of different columns")
+        self.rows += other.rows
+        self.rejected += other.rejected
+        for mine, theirs in zip(self.columns, other.columns):
+            mine.merge(theirs)
+        return self
+
+    def summary(self) -> Dict[str, dict]:
+        return {c.name: c.summary() for c in self.columns}
+
+    def to_dict(self) -> dict:
+        """Full, mergeable state (counts + serialised sketches)."""
+        return {
+            "rows": self.rows,
+            "rejected": self.rejected,
+            "hll_precision": self.hll_precision,
+            "compression": self.compression,
+            "columns": {
+                c.name: {
+                    "count": c.count,
+                    "nulls": c.nulls,
+                    "empties": c.empties,
+                    "non_finite": c.non_finite,
+                    "min": c.min,
+                    "max": c.max,
+                    **c.sketches(),
+                }
+                for c in self.columns
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DatasetProfile":
+        columns = data["columns"]
+        profile = cls(
+            list(columns),
+            distinct=[n for n, c in columns.items() if "hll" in c],
+            quantiles=[n for n, c in columns.items() if "tdigest" in c],
+            hll_precision=data["hll_precision"],
+            compression=data["compression"],
+        )
+        profile.rows = data["rows"]
+        profile.rejected = data["rejected"]
+        for column in profile.columns:
+            stored = columns[column.name]
+            column.count = stored["count"]
+            column.nulls = stored["nulls"]
+            column.empties = stored["empties"]
+            column.non_finite = stored["non_finite"]
+            column.min = stored["min"]
+            column.max = stored["max"]
+            if column.hll is not None:
+                column.hll = HyperLogLog.from_dict(stored["hll"])
+            if column.digest is not None:
+                column.digest = TDigest.from_dict(stored["tdigest"])
+        return profile
+
+
+def profile_from_config(cfg: dict) -> DatasetProfile:
+    """Build an empty DatasetProfile from the `data_profile:` config section."""
+    prof_cfg = cfg.get("data_profile") or {}
+    return DatasetProfile(
+        distinct=prof_cfg.get("distinct", DEFAULT_DISTINCT),
+        quantiles=prof_cfg.get("quantiles", DEFAULT_QUANTILES),
+        hll_precision=int(prof_cfg.get("hll_precision", 12)),
+        compression=float(prof_cfg.get("tdigest_compression", 100)),
+    )
@@ -1,3 +1,21 @@
+# Column order of the stg_movies staging table; transformed rows are tuples
+# in this order so every sink can consume them without re-mapping.
+STG_MOVIES_COLUMNS = (
+    "rank_num",
+    "title",
+    "genre",
+    "description",
+    "director",
+    "actors",
+    "year",
+    "runtime_minutes",
+    "rating",
+    "votes",
+    "revenue_millions",
+    "metascore",
+)
+
+
 def to_int(value):
     if value is None or str(value).strip() == "":
         return None
@@ -1,5 +1,4 @@
 # validator.py
-# validator.py
 """
 Row-level validator for IMDB movie records.
 
@@ -8,6 +7,10 @@ Revenue, Metascore) for presence, correct types, and reasonable ranges.
 Returns a (is_valid, error_reason) tuple so the ingestion pipeline can
 either load clean rows or route bad ones into rejection paths with a
 human-readable error summary.
+
+validate_and_coerce does the work and also returns the parsed, typed
+values, so the pipeline parses every field only once; validate_movie is
+the boolean view of it.
 """
 
 def validate_movie(row: dict) -> tuple:
@@ -15,6 +18,70 @@ def validate_movie(row: dict) -> tuple:
     Return (is_valid, error_reason).
     error_reason is empty string if the row is valid.
     """
+    values, error_reason = validate_and_coerce(row)
+    return values is not None, error_reason
+
+
+def validate_and_coerce(row: dict) -> tuple:
+    """
+    Validate and convert a raw row in one pass.
+
+    Every field is parsed once; the parsed values are kept for the sinks
+    instead of being re-parsed by the transform step.
+
+    Return (values, error_reason):
+      - values is a tuple in STG_MOVIES_COLUMNS order and error_reason is ""
+        when the row is valid
+      - values is None and error_reason is the "; "-joined reasons otherwise
+    """
+    # Fast path for the common, fully valid row: parse everything and check
+    # all ranges at once without collecting messages. int()/float() ignore
+    # surrounding whitespace, so parsing the raw value is the same as parsing
+    # the stripped one. Anything unusual falls through to the full check,
+    # which is the single source of truth for the rules and messages.
+    title = (row.get("Title") or "").strip()
+    try:
+        rank_val = int(row.get("Rank"))
+        year_val = int(row.get("Year"))
+        runtime_val = int(row.get("Runtime (Minutes)") or "")
+        rating_val = float(row.get("Rating") or "")
+        votes_val = int(row.get("Votes") or "")
+        revenue_val = float(row.get("Revenue (Millions)") or "")
+        metascore_val = int(row.get("Metascore") or "")
+    except (TypeError, ValueError):
+        return _validate_and_coerce_full(row)
+
+    if (
+        title
+        and rank_val > 0
+        and 1900 <= year_val <= 2030
+        and 0 < runtime_val <= 400
+        and 0 <= rating_val <= 10
+        and votes_val >= 0
+        and revenue_val >= 0
+        and 0 <= metascore_val <= 100
+    ):
+        return (
+            rank_val,
+            title,
+            (row.get("Genre") or "").strip(),
+            (row.get("Description") or "").strip(),
+            (row.get("Director") or "").strip(),
+            (row.get("Actors") or "").strip(),
+            year_val,
+            runtime_val,
+            rating_val,
+            votes_val,
+            revenue_val,
+            # stg_movies stores metascore as a float
+            float(metascore_val),
+        ), ""
+
+    return _validate_and_coerce_full(row)
+
+
+def _validate_and_coerce_full(row: dict) -> tuple:
+    """Rule-by-rule check that collects every error message for the row."""
     errors = []
 
     # ---- Title (required) ----
@@ -100,6 +167,40 @@ def validate_movie(row: dict) -> tuple:
 
     # ---- Final decision ----
     if errors:
-        return False, "; ".join(errors)
+        return None, "; ".join(errors)
 
-    return True, ""
+    return (
+        rank_val,
+        title,
+        (row.get("Genre") or "").strip(),
+        (row.get("Description") or "").strip(),
+        (row.get("Director") or "").strip(),
+        (row.get("Actors") or "").strip(),
+        year_val,
+        runtime_val,
+        rating_val,
+        votes_val,
+        revenue_val,
+        # stg_movies stores metascore as a float
+        float(metascore_val),
+    ), ""
+
+
+def validate_and_coerce_batch(rows) -> tuple:
+    """
+    Batch form of validate_and_coerce.
+
+    Return (valid, rejects): a list of typed tuples ready for the sinks, and
+    a list of (raw_row, error_reason) pairs.
+    """
+    valid = []
+    rejects = []
+    add_valid = valid.append
+    add_reject = rejects.append
+    for row in rows:
+        values, error_reason = validate_and_coerce(row)
+        if values is None:
+            add_reject((row, error_reason))
+        else:
+            add_valid(values)
+    return valid, rejects
@@ -0,0 +1,40 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+"""
+Shared pytest fixtures.
+
+pg_conn gives PostgreSQL tests a connection to the scratch database named
+by INGESTION_TEST_DSN, with the ingestion tables created in a throwaway
+ingestion_test schema. Tests that use it are skipped when the variable is
+not set.
+"""
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+@pytest.fixture
+def pg_conn():
+    dsn = os.environ.get("INGESTION_TEST_DSN")
+    if not dsn:
+        pytest.skip("set INGESTION_TEST_DSN to run PostgreSQL tests")
+    psycopg2 = pytest.importorskip("psycopg2")
+    from src.load.db import create_tables
+
+    conn = psycopg2.connect(dsn)
+    with conn.cursor() as cur:
+        cur.execute("DROP SCHEMA IF EXISTS ingestion_test CASCADE; CREATE SCHEMA ingestion_test;")
+        cur.execute("SET search_path TO ingestion_test;")
+    create_tables(conn)
+    conn.commit()
+    yield conn
+    conn.rollback()
+    with conn.cursor() as cur:
+        cur.execute("DROP SCHEMA ingestion_test CASCADE;")
+    conn.commit()
+    conn.close()
@@ -0,0 +1,129 @@
+# tests/legacy_validator.py
+"""
+The validator as it was before validate_and_coerce existed, kept as the
+independent reference for tests/test_validator.py and the baseline for
+benchmarks/bench_validate_coerce.py. validator.validate_movie now wraps
+validate_and_coerce, so it cannot serve as its own reference.
+"""
+
+from src.transform.transformers import to_int, to_float
+
+
+def legacy_validate_movie(row: dict) -> tuple:
+    """Copy of validate_movie as it was before validate_and_coerce existed."""
+    errors = []
+
+    # ---- Title (required) ----
+    title = (row.get("Title") or "").strip()
+    if not title:
+        errors.append("Missing Title")
+
+    # ---- Rank (required, positive int) ----
+    try:
+        rank_val = int(row.get("Rank"))
+        if rank_val <= 0:
+            errors.append("Rank must be positive")
+    except (TypeError, ValueError):
+        errors.append("Rank is not an integer")
+
+    # ---- Year (required, within reasonable range) ----
+    try:
+        year_val = int(row.get("Year"))
+        if year_val < 1900 or year_val > 2030:
+            errors.append("Year out of allowed range")
+    except (TypeError, ValueError):
+        errors.append("Year is not an integer")
+
+    # ---- Runtime (Minutes) – required, sane range ----
+    runtime_raw = (row.get("Runtime (Minutes)") or "").strip()
+    if runtime_raw == "":
+        errors.append("Missing Runtime")
+    else:
+        try:
+            runtime_val = int(runtime_raw)
+            if runtime_val <= 0 or runtime_val > 400:
+                errors.append("Runtime out of range 1–400 minutes")
+        except ValueError:
+            errors.append("Runtime is not an integer")
+
+    # ---- Rating – required, 0–10 ----
+    rating_raw = (row.get("Rating") or "").strip()
+    if rating_raw == "":
+        errors.append("Missing Rating")
+    else:
+        try:
+            rating_val = float(rating_raw)
+            if rating_val < 0 or rating_val > 10:
+                errors.append("Rating out of range 0–10")
+        except ValueError:
+            errors.append("Rating is not a number")
+
+    # ---- Votes – required, non-negative integer ----
+    votes_raw = (row.get("Votes") or "").strip()
+    if votes_raw == "":
+        errors.append("Missing Votes")
+    else:
+        try:
+            votes_val = int(votes_raw)
+            if votes_val < 0:
+                errors.append("Votes must be non-negative")
+        except ValueError:
+            errors.append("Votes is not an integer")
+
+    # ---- Revenue (Millions) – required, non-negative ----
+    revenue_raw = (row.get("Revenue (Millions)") or "").strip()
+    if revenue_raw == "":
+        errors.append("Missing Revenue")
+    else:
+        try:
+            revenue_val = float(revenue_raw)
+            if revenue_val < 0:
+                errors.append("Revenue must be non-negative")
+        except ValueError:
+            errors.append("Revenue is not a number")
+
+    # ---- Metascore – required, 0–100 ----
+    metascore_raw = (row.get("Metascore") or "").strip()
+    if metascore_raw == "":
+        errors.append("Missing Metascore")
+    else:
+        try:
+            metascore_val = int(metascore_raw)
+            if metascore_val < 0 or metascore_val > 100:
+                errors.append("Metascore out of range 0–100")
+        except ValueError:
+            errors.append("Metascore is not an integer")
+
+    # ---- Final decision ----
+    if errors:
+        return False, "; ".join(errors)
+
+    return True, ""
+
+
+def validate_then_transform(rows):
+    """The per-row sequence run_ingestion used before validate_and_coerce."""
+    valid = []
+    rejects = []
+    for r in rows:
+        is_valid, error_reason = legacy_validate_movie(r)
+        if not is_valid:
+            rejects.append((r, error_reason))
+            continue
+        valid.append(
+            (
+                to_int(r.get("Rank")),
+                (r.get("Title") or "").strip(),
+                (r.get("Genre") or "").strip(),
+                (r.get("Description") or "").strip(),
+                (r.get("Director") or "").strip(),
+                (r.get("Actors") or "").strip(),
+                to_int(r.get("Year")),
+                to_int(r.get("Runtime (Minutes)")),
+                to_float(r.get("Rating")),
+                to_int(r.get("Votes")),
+                to_float(r.get("Revenue (Millions)")),
+                to_float(r.get("Metascore")),
+            )
+        )
+    return valid, rejects
@@ -0,0 +1,119 @@
+# tests/test_batching.py
+import os
+import sys
+
+import pytest
+
+"""
+Pytest suite for adaptive batch sizing.
+
+Feeds AdaptiveBatchSizer synthetic flush timings and RSS readings and
+checks that it steers towards the latency target, backs off growth that
+costs throughput, sheds memory, stays within bounds and records a reason
+for every change.
+"""
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.load.batching import AdaptiveBatchSizer, sizer_from_config
+
+
+def _flush(sizer, seconds_per_row, source="db"):
+    sizer.observe(source, sizer.size, seconds_per_row * sizer.size)
+    return sizer.next_size()
+
+
+def test_grows_towards_target_for_fast_flushes():
+    sizer = AdaptiveBatchSizer(initial=1000, max_size=50_000, target_latency_ms=100)
+    sizer.next_size()
+    for _ in range(10):
+        _flush(sizer, 1e-5)          # 10 us/row -> 10_000 rows per 100 ms
+    # settles inside the latency band around 10_000
+    assert 7_500 <= sizer.size <= 12_500
+    assert all("below target" in d["reason"] for d in sizer.decisions)
+    # at most doubling per step
+    assert all(d["to"] <= 2 * d["from"] for d in sizer.decisions)
+
+
+def test_shrinks_for_slow_flushes_within_bounds():
+    sizer = AdaptiveBatchSizer(initial=1000, min_size=200, target_latency_ms=100)
+    sizer.next_size()
+    for _ in range(10):
+        _flush(sizer, 1e-2)          # 10 ms/row
+    assert sizer.size == 200
+    assert "above target" in sizer.decisions[0]["reason"]
+
+
+def test_growth_that_costs_throughput_is_undone():
+    sizer = AdaptiveBatchSizer(initial=1000, max_size=50_000, target_latency_ms=1000)
+    sizer.next_size()
+    _flush(sizer, 1e-5)
+    assert sizer.size == 2000
+    # per-row cost jumps at the larger size (e.g. memory pressure)
+    _flush(sizer, 1e-4)
+    _flush(sizer, 1e-5)
+    assert sizer.size == 1000
+    assert any("throughput fell" in d["reason"] for d in sizer.decisions)
+    # the old size is now the ceiling
+    for _ in range(3):
+        _flush(sizer, 1e-5)
+    assert sizer.size == 1000
+
+
+def test_rss_above_limit_halves_batches():
+    rss = [100.0]
+    sizer = AdaptiveBatchSizer(initial=4000, max_rss_mb=500, rss_probe=lambda: rss[0])
+    sizer.next_size()
+    rss[0] = 600.0
+    assert sizer.next_size() == 2000
+    # RSS did not rise further: no second shrink
+    assert sizer.next_size() == 2000
+    rss[0] = 700.0
+    assert sizer.next_size() == 1000
+    assert sizer.decisions[0]["reason"].startswith("RSS 600 MB above limit")
+
+
+def test_waits_for_every_expected_sink():
+    sizer = AdaptiveBatchSizer(initial=1000, target_latency_ms=100)
+    sizer.expect(["fast", "slow"])
+    sizer.observe("fast", 1000, 0.001)
+    assert sizer.next_size() == 1000
+    sizer.observe("slow", 1000, 1.0)
+    assert sizer.next_size() == 500
+
+
+def test_metrics_and_config():
+    sizer = sizer_from_config(
+        {"batch_size": 500, "adaptive_batching": {"enabled": True, "min_size": 50, "max_size": 800}}
+    )
+    sizer.next_size()
+    _flush(sizer, 1e-6)
+    metrics = sizer.metrics()
+    assert metrics["initial_size"] == 500 and metrics["final_size"] == 800
+    assert metrics["decisions"][0]["from"] == 500
+    assert sizer_from_config({"batch_size": 500}) is None
+    with pytest.raises(ValueError):
+        AdaptiveBatchSizer(min_size=10, max_size=5)
+
+
+def test_growth_is_judged_on_batches_cut_at_the_new_size():
+    # per-row cost jumps 10x above 1500 rows; flushes are reported from
+    # behind an 8-batch queue, so the first observations after a change
+    # still come from batches cut at the old size
+    sizer = AdaptiveBatchSizer(initial=1000, max_size=20_000, target_latency_ms=100)
+    queued = []
+    sizes = []
+    for _ in range(200):
+        size = sizer.next_size()
+        sizes.append(size)
+        queued.append((sizer.batches, size))
+        if len(queued) > 8:
+            seq, rows = queued.pop(0)
+            per_row = 1e-5 if rows <= 1500 else 1e-4
+            sizer.observe("db", rows, per_row * rows, seq)
+
+    assert max(sizes) == 2000
+    assert any("throughput fell" in d["reason"] for d in sizer.decisions)
+    assert sizer.size == 1000
@@ -0,0 +1,126 @@
+# tests/test_data_profile.py
+import json
+import math
+import os
+import random
+import sys
+
+import pytest
+
+"""
+Pytest suite for the one-pass column profiles.
+
+Checks the plain counts and min/max, that HyperLogLog and t-digest stay
+within their expected error, and that profiles built over separate batches
+(or serialised by separate workers) merge into the profile of the whole.
+"""
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.transform.data_profile import DatasetProfile, HyperLogLog, TDigest
+
+
+def test_hyperloglog_estimate_within_error():
+    hll = HyperLogLog(precision=12)
+    hll.update(f"director-{i}" for i in range(50_000))
+    assert abs(hll.estimate() - 50_000) / 50_000 < 0.05
+
+
+def test_hyperloglog_small_cardinality_is_near_exact():
+    hll = HyperLogLog()
+    hll.update(["Drama", "Action", "Drama", "Comedy"])
+    assert hll.estimate() == 3
+
+
+def test_hyperloglog_merge_is_exact():
+    a, b, whole = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    a.update(range(0, 6000))
+    b.update(range(4000, 10000))
+    whole.update(range(0, 10000))
+    a.merge(b)
+    assert a.registers == whole.registers
+
+
+def test_tdigest_quantiles():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(0, 1) for _ in range(50_000)]
+    digest = TDigest(compression=100)
+    digest.update(values)
+    values.sort()
+    for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+        exact = values[int(q * len(values))]
+        assert digest.quantile(q) == pytest.approx(exact, rel=0.05)
+    assert digest.quantile(0) == values[0]
+    assert digest.quantile(1) == values[-1]
+
+
+def test_tdigest_merge_matches_single_digest():
+    rng = random.Random(3)
+    values = [rng.uniform(0, 10) for _ in range(20_000)]
+    parts = [TDigest() for _ in range(4)]
+    for i, v in enumerate(values):
+        parts[i % 4].add(v)
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+    assert merged.count == len(values)
+    assert merged.min == min(values)
+    assert merged.max == max(values)
+    assert merged.quantile(0.5) == pytest.approx(5, abs=0.2)
+
+
+def _rows():
+    # (title, director, rating)
+    return [
+        ("A", "Nolan", 8.1),
+        ("B", "", 6.0),
+        ("C", None, float("nan")),
+        ("D", "Nolan", 7.5),
+    ]
+
+
+def test_dataset_profile_counts():
+    profile = DatasetProfile(
+        columns=("title", "director", "rating"),
+        distinct=("director",),
+        quantiles=("rating",),
+    )
+    profile.update(_rows(), rejected=2)
+    summary = profile.summary()
+
+    assert profile.rows == 4 and profile.rejected == 2
+    assert summary["director"]["nulls"] == 1
+    assert summary["director"]["empties"] == 1
+    assert summary["director"]["distinct_estimate"] == 1
+    assert summary["rating"]["non_finite"] == 1
+    assert (summary["rating"]["min"], summary["rating"]["max"]) == (6.0, 8.1)
+    assert summary["title"]["min"] == "A" and summary["title"]["max"] == "D"
+
+
+def test_dataset_profile_rejects_unknown_columns():
+    with pytest.raises(ValueError):
+        DatasetProfile(columns=("title",), distinct=("director",), quantiles=())
+
+
+def test_serialised_profiles_merge_into_whole():
+    kwargs = dict(columns=("title", "director", "rating"), distinct=("director",), quantiles=("rating",))
+    rows = _rows() * 50
+    whole = DatasetProfile(**kwargs)
+    whole.update(rows, rejected=3)
+
+    first, second = DatasetProfile(**kwargs), DatasetProfile(**kwargs)
+    first.update(rows[:120], rejected=1)
+    second.update(rows[120:], rejected=2)
+    # round-trip through JSON as a worker process would
+    restored = [DatasetProfile.from_dict(json.loads(json.dumps(p.to_dict()))) for p in (first, second)]
+    merged = restored[0].merge(restored[1])
+
+    assert merged.rows == whole.rows and merged.rejected == whole.rejected
+    a, b = merged.summary(), whole.summary()
+    for name in ("title", "director"):
+        assert a[name] == b[name]
+    assert a["rating"]["min"] == b["rating"]["min"]
+    assert a["rating"]["max"] == b["rating"]["max"]
+    assert not math.isnan(a["rating"]["quantiles"]["0.5"])
@@ -1,4 +1,5 @@
 # tests/test_data_reader.py
+import csv
 import os
 import sys
 
@@ -6,7 +7,9 @@ import sys
 Pytest suite for the data_reader module.
 
 Verifies that read_movies successfully reads the IMDB CSV file and
-returns a non-empty list of row dicts with expected columns such as "Title".
+returns a non-empty list of row dicts with expected columns such as "Title",
+that the memory-mapped reader agrees with csv.DictReader, and that the
+JSON and incremental readers return each complete record exactly once.
 """
 
 # Make sure we can import data_reader from project root
@@ -14,7 +17,7 @@ PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-import src.data_reader as data_reader
+from src.reader import data_reader
 
 
 def test_read_movies_returns_rows():
@@ -24,3 +27,141 @@ def test_read_movies_returns_rows():
     # basic sanity checks
     assert len(rows) > 0
     assert "Title" in rows[0]
+
+
+def test_mmap_reader_matches_dict_reader():
+    csv_path = "data/imdb_movie_dataset.csv"
+    expected = data_reader.read_movies(csv_path)
+
+    with data_reader.MmapCsv(csv_path) as csv_map:
+        assert len(csv_map) == len(expected)
+        assert list(csv_map.iter_rows()) == expected
+
+
+def test_mmap_reader_decodes_only_requested_fields(tmp_path):
+    path = tmp_path / "movies.csv"
+    path.write_bytes(
+        b'Rank,Title,Description\r\n'
+        b'1,"Quoted, title","Line one\nline ""two"""\r\n'
+        b'\r\n'
+        b'2,Plain,\n'
+        b'3,Short\n'
+        b'4,Tall,5\'10" tall\r\n'
+        b'5,"After ""stray""",x'
+    )
+
+    with data_reader.MmapCsv(str(path)) as csv_map:
+        assert len(csv_map) == 5
+        assert csv_map.get_fields(0, ["Title"]) == {"Title": "Quoted, title"}
+        assert csv_map.get_fields(0)["Description"] == 'Line one\nline "two"'
+        assert csv_map.get_fields(1, ["Description"]) == {"Description": ""}
+        assert csv_map.get_fields(2, ["Description"]) == {"Description": None}
+        assert bytes(csv_map.row_view(1)) == b"2,Plain,"
+        assert bytes(csv_map.batch_view(1, 3)) == b"2,Plain,\n3,Short"
+        # a quote inside an unquoted field is data, not the start of a quote
+        assert csv_map.get_fields(3) == {"Rank": "4", "Title": "Tall", "Description": '5\'10" tall'}
+        assert csv_map.get_fields(4, ["Title"]) == {"Title": 'After "stray"'}
+
+    with open(path, newline="", encoding="utf-8") as f:
+        expected = [row for row in csv.DictReader(f)]
+    with data_reader.MmapCsv(str(path)) as csv_map:
+        assert list(csv_map.iter_rows()) == expected
+
+
+def test_mmap_shards_cover_all_rows():
+    with data_reader.MmapCsv("data/imdb_movie_dataset.csv") as csv_map:
+        shards = csv_map.shard(4)
+        assert shards[0][0] == 0
+        assert shards[-1][1] == len(csv_map)
+        assert all(a[1] == b[0] for a, b in zip(shards, shards[1:]))
+
+        boundaries = csv_map.boundaries
+        start, stop = shards[1]
+        with data_reader.MmapCsv(csv_map.path, boundaries=boundaries) as worker:
+            titles = [r["Title"] for r in worker.iter_rows(["Title"], start, stop)]
+        assert titles == [r["Title"] for r in csv_map.iter_rows(["Title"], start, stop)]
+
+
+def test_read_json_records_array_and_ndjson(tmp_path):
+    customers = data_reader.read_json_records("data/customers.json")
+    assert len(customers) == 5
+    assert customers[0]["customer_name"] == "Alice Johnson"
+
+    ndjson = tmp_path / "events.ndjson"
+    ndjson.write_text('{"a": 1}\n\n{"a": 2}\n')
+    assert data_reader.read_json_records(str(ndjson)) == [{"a": 1}, {"a": 2}]
+
+
+def test_read_new_records_csv_waits_for_complete_rows(tmp_path):
+    path = tmp_path / "movies.csv"
+    path.write_text('Rank,Title,Description\n1,A,"two\nlines')
+
+    records, state = data_reader.read_new_records(str(path))
+    assert records == []
+    assert state["header"] == ["Rank", "Title", "Description"]
+
+    with open(path, "a") as f:
+        f.write(' here"\n2,B,x\n3,C')
+    records, state = data_reader.read_new_records(str(path), state)
+    assert [r["Title"] for r in records] == ["A", "B"]
+    assert records[0]["Description"] == "two\nlines here"
+
+    with open(path, "a") as f:
+        f.write(",y\n")
+    records, state = data_reader.read_new_records(str(path), state)
+    assert records == [{"Rank": "3", "Title": "C", "Description": "y"}]
+    assert data_reader.read_new_records(str(path), state)[0] == []
+
+    # truncated and rewritten: start over
+    path.write_text("Rank,Title,Description\n9,Z,z\n")
+    records, _ = data_reader.read_new_records(str(path), state)
+    assert [r["Title"] for r in records] == ["Z"]
+
+
+def test_read_new_records_csv_stray_quote_and_stall(tmp_path, caplog):
+    path = tmp_path / "people.csv"
+    path.write_text("Rank,Title,Height\n1,A,5'10\" tall\n")
+    records, state = data_reader.read_new_records(str(path))
+    assert records == [{"Rank": "1", "Title": "A", "Height": '5\'10" tall'}]
+
+    # the stray quote does not hold back rows appended after it
+    with open(path, "a") as f:
+        f.write('2,"B, the second",6ft\n')
+    records, state = data_reader.read_new_records(str(path), state)
+    assert records == [{"Rank": "2", "Title": "B, the second", "Height": "6ft"}]
+
+    # a quoted field that is never closed stalls the file, with one warning
+    with open(path, "a") as f:
+        f.write('3,"C,' + "x" * 100 + "\n")
+    with caplog.at_level("WARNING"):
+        for _ in range(2):
+            records, state = data_reader.read_new_records(str(path), state, max_bytes=16, max_record_bytes=64)
+            assert records == []
+    assert state["stalled_at"] == state["offset"]
+    assert len([r for r in caplog.records if "stalled" in r.getMessage()]) == 1
+
+    with open(path, "a") as f:
+        f.write('",7ft\n')
+    records, state = data_reader.read_new_records(str(path), state, max_bytes=16, max_record_bytes=1024)
+    assert [r["Rank"] for r in records] == ["3"] and "stalled_at" not in state
+
+
+def test_read_new_records_ndjson_and_array(tmp_path):
+    ndjson = tmp_path / "events.ndjson"
+    ndjson.write_text('{"a": 1}\n{"a"')
+    records, state = data_reader.read_new_records(str(ndjson))
+    assert records == [{"a": 1}]
+    with open(ndjson, "a") as f:
+        f.write(': 2}\n')
+    assert data_reader.read_new_records(str(ndjson), state)[0] == [{"a": 2}]
+
+    array = tmp_path / "customers.json"
+    array.write_text('[{"id": 1},')
+    records, state = data_reader.read_new_records(str(array))
+    assert records == []
+    array.write_text('[{"id": 1}, {"id": 2}]')
+    records, state = data_reader.read_new_records(str(array), state)
+    assert records == [{"id": 1}, {"id": 2}]
+    # arrays grow by rewriting: only the new tail is returned
+    array.write_text('[{"id": 1}, {"id": 2}, {"id": 3}]')
+    assert data_reader.read_new_records(str(array), state)[0] == [{"id": 3}]
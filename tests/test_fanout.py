@@ -0,0 +1,257 @@
+# tests/test_fanout.py
+import csv
+import os
+import sys
+import threading
+from contextlib import nullcontext
+from unittest import mock
+
+import pytest
+
+"""
+Pytest suite for the single-pass fan-out writer.
+
+Checks that every sink receives every batch once, that the reject CSV keeps
+the layout load_rejects_to_db expects, that a failing sink aborts the run,
+and that a slow sink does not hold back a fast one beyond its queue size.
+"""
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+pytest.importorskip("psycopg2")
+
+from src.load import fanout
+from src.load.fanout import Batch, FanOutWriter, RejectCsvSink, RejectsRawSink, CleanCsvSink, Sink
+
+
+class RecordingSink(Sink):
+    name = "recording"
+
+    def __init__(self, queue_size=8, gate=None):
+        super().__init__(queue_size)
+        self.seen = []
+        self.finished = False
+        self.aborted = False
+        self.gate = gate
+
+    def write(self, batch):
+        if self.gate is not None:
+            self.gate.wait()
+        self.seen.append(batch)
+
+    def finish(self):
+        self.finished = True
+
+    def abort(self):
+        self.aborted = True
+
+
+class FailingSink(RecordingSink):
+    name = "failing"
+
+    def write(self, batch):
+        raise ValueError("boom")
+
+
+MOVIE = (1, "Guardians of the Galaxy", "Action", "desc", "James Gunn", "Chris Pratt",
+         2014, 121, 8.1, 757074, 333.13, 76.0)
+RAW_REJECT = {"Rank": "8", "Title": "Mindhorn", "Year": "2016", "Rating": "6.4", "Votes": "2490"}
+
+
+def test_every_sink_gets_every_batch(tmp_path):
+    recording = RecordingSink()
+    reject_csv = tmp_path / "rejected_rows.csv"
+    clean_csv = tmp_path / "clean.csv"
+    batches = [
+        Batch("data/x.csv", [MOVIE], [(RAW_REJECT, "Missing Revenue")]),
+        Batch("data/x.csv", [MOVIE], []),
+    ]
+
+    with FanOutWriter([recording, RejectCsvSink(str(reject_csv)), CleanCsvSink(str(clean_csv))]) as writer:
+        for batch in batches:
+            writer.write(batch)
+
+    assert recording.seen == batches
+    assert recording.finished and not recording.aborted
+
+    with open(reject_csv, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert rows == [{
+        "source_file": "data/x.csv", "rank": "8", "title": "Mindhorn", "year": "2016",
+        "rating": "6.4", "votes": "2490", "error_reason": "Missing Revenue",
+    }]
+
+    with open(clean_csv, newline="") as f:
+        assert len(list(csv.DictReader(f))) == 2
+
+
+def test_failing_sink_aborts_others():
+    healthy = RecordingSink()
+
+    with pytest.raises(RuntimeError, match="sink failing failed"):
+        with FanOutWriter([healthy, FailingSink()]) as writer:
+            writer.write(Batch("x", [MOVIE], []))
+
+    assert healthy.aborted and not healthy.finished
+
+
+def test_file_sinks_leave_no_partial_output_on_abort(tmp_path):
+    reject_csv = tmp_path / "rejected_rows.csv"
+    clean_csv = tmp_path / "clean.csv"
+    batch = Batch("data/x.csv", [MOVIE], [(RAW_REJECT, "Missing Revenue")])
+
+    # append mode (watch): the first run creates the files with a header
+    with FanOutWriter([RejectCsvSink(str(reject_csv), append=True),
+                       CleanCsvSink(str(clean_csv), append=True)]) as writer:
+        writer.write(batch)
+    before = reject_csv.read_bytes(), clean_csv.read_bytes()
+
+    with pytest.raises(RuntimeError):
+        with FanOutWriter([RejectCsvSink(str(reject_csv), append=True),
+                           CleanCsvSink(str(clean_csv), append=True), FailingSink()]) as writer:
+            writer.write(batch)
+    assert (reject_csv.read_bytes(), clean_csv.read_bytes()) == before
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["clean.csv", "rejected_rows.csv"]
+
+    # a successful append adds rows without a second header
+    with FanOutWriter([CleanCsvSink(str(clean_csv), append=True)]) as writer:
+        writer.write(batch)
+    with open(clean_csv, newline="") as f:
+        assert len(list(csv.DictReader(f))) == 2
+
+    # overwrite mode: an aborted run keeps the previous file
+    with pytest.raises(RuntimeError):
+        with FanOutWriter([CleanCsvSink(str(clean_csv)), FailingSink()]) as writer:
+            writer.write(batch)
+    with open(clean_csv, newline="") as f:
+        assert len(list(csv.DictReader(f))) == 2
+    assert not (tmp_path / "clean.csv.tmp").exists()
+
+
+class FailingFinishSink(RecordingSink):
+    name = "failing_finish"
+
+    def finish(self):
+        raise OSError("commit failed")
+
+
+class FailingAbortSink(RecordingSink):
+    name = "failing_abort"
+
+    def abort(self):
+        raise OSError("connection lost")
+
+
+def _close_in_thread(writer, abort=False):
+    errors = []
+
+    def _close():
+        try:
+            writer.close(abort=abort)
+        except RuntimeError as exc:
+            errors.append(exc)
+
+    thread = threading.Thread(target=_close, daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+    assert not thread.is_alive(), "close() hung"
+    return errors
+
+
+def test_failing_finish_or_abort_raises_instead_of_hanging():
+    sink = FailingFinishSink()
+    writer = FanOutWriter([sink])
+    writer.__enter__()
+    writer.write(Batch("x", [MOVIE], []))
+    errors = _close_in_thread(writer)
+    assert [str(e) for e in errors] == ["sink failing_finish failed"]
+    # a failed finish rolls back
+    assert sink.aborted
+
+    writer = FanOutWriter([FailingAbortSink()])
+    writer.__enter__()
+    writer.write(Batch("x", [MOVIE], []))
+    # the caller is aborting: the sink's failure is logged, not re-raised
+    assert _close_in_thread(writer, abort=True) == []
+
+
+class FakeConn:
+    def __init__(self):
+        self.pending = []
+        self.committed = []
+        self.commits = 0
+
+    def commit(self):
+        self.committed.extend(self.pending)
+        self.pending = []
+        self.commits += 1
+
+    def rollback(self):
+        self.pending = []
+
+    def cursor(self):
+        # insert_bisecting's savepoint statements
+        return nullcontext(mock.MagicMock())
+
+
+def test_rejects_raw_commits_in_chunks(monkeypatch):
+    conn = FakeConn()
+    monkeypatch.setattr(fanout, "get_connection", lambda cfg: nullcontext(conn))
+    monkeypatch.setattr(
+        fanout, "insert_rejects", lambda c, records, commit: c.pending.extend(records)
+    )
+    reject = Batch("x", [], [(RAW_REJECT, "Missing Revenue")])
+    clean = Batch("x", [MOVIE], [])
+
+    # chunks close after the same batches as StagingTablesSink: every 2 input rows
+    sink = RejectsRawSink({}, chunk_size=2)
+    with pytest.raises(KeyboardInterrupt):
+        with FanOutWriter([sink]) as writer:
+            for batch in (reject, clean, reject, reject, reject):
+                writer.write(batch)
+            raise KeyboardInterrupt
+    assert conn.commits == 2
+    assert len(conn.committed) == sink.committed == 3
+    assert sink.written == 4
+
+
+def test_slow_sink_only_blocks_after_its_queue_fills():
+    gate = threading.Event()
+    slow = RecordingSink(queue_size=2, gate=gate)
+    fast = RecordingSink(queue_size=2)
+    writer = FanOutWriter([fast, slow])
+    writer.__enter__()
+
+    # slow holds one batch in write() plus two queued; the producer is
+    # not blocked yet and the fast sink keeps up
+    for i in range(3):
+        writer.write(Batch(str(i), [], []))
+    producer = threading.Thread(target=writer.write, args=(Batch("3", [], []),))
+    producer.start()
+    producer.join(timeout=0.2)
+    assert producer.is_alive()
+
+    gate.set()
+    producer.join()
+    writer.__exit__(None, None, None)
+    assert [b.source_file for b in slow.seen] == ["0", "1", "2", "3"]
+    assert [b.source_file for b in fast.seen] == ["0", "1", "2", "3"]
+
+
+def test_rejects_raw_isolates_refused_rows(monkeypatch):
+    conn = FakeConn()
+    monkeypatch.setattr(fanout, "get_connection", lambda cfg: nullcontext(conn))
+
+    def insert(c, records, commit):
+        if any(r["error_reason"] == "refused" for r in records):
+            raise ValueError("refused by the database")
+        c.pending.extend(records)
+
+    monkeypatch.setattr(fanout, "insert_rejects", insert)
+    rejects = [(RAW_REJECT, "Missing Revenue")] * 3 + [(RAW_REJECT, "refused")]
+    sink = RejectsRawSink({})
+    with FanOutWriter([sink]) as writer:
+        writer.write(Batch("x", [], rejects))
+    assert sink.committed == 3 and len(conn.committed) == 3
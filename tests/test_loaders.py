@@ -0,0 +1,128 @@
+# tests/test_loaders.py
+import math
+import os
+import sys
+
+import pytest
+
+"""
+Pytest suite for the loader helpers.
+
+Checks how refused rows are turned into stg_rejects records and, when
+INGESTION_TEST_DSN points at a scratch PostgreSQL database, that
+insert_bisecting isolates exactly the refused rows, keeps the rest, and
+sends every good row to the database once.
+"""
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+from src.load.loaders import (
+    db_error_reason,
+    db_reject_record,
+    insert_bisecting,
+    insert_movies,
+    insert_raw_records,
+    insert_rejects,
+    insert_stg_rejects,
+    jsonb_safe,
+)
+from src.reader.data_reader import read_movies
+from src.transform.transformers import STG_MOVIES_COLUMNS
+from src.validator.validator import validate_and_coerce_batch
+
+
+def test_db_reject_record_is_jsonb_safe():
+    row = (1, "Bad\x00Title", "Drama", "", "Someone", "", 2010, 90, float("nan"), 10, float("inf"), 50.0)
+    record = db_reject_record(row)
+    assert list(record) == list(STG_MOVIES_COLUMNS)
+    assert record["title"] == "Bad\\x00Title"
+    assert record["rating"] == "nan" and record["revenue_millions"] == "inf"
+    assert record["votes"] == 10 and math.isclose(record["metascore"], 50.0)
+
+
+def test_jsonb_safe_recurses_into_records():
+    raw = {"Title": "Bad\x00Title", "Bad\x00Key": [1.5, float("nan"), {"x": "\x00"}], None: "extra"}
+    assert jsonb_safe(raw) == {
+        "Title": "Bad\\x00Title",
+        "Bad\\x00Key": [1.5, "nan", {"x": "\\x00"}],
+        None: "extra",
+    }
+
+
+def test_db_error_reason_uses_first_line():
+    exc = ValueError("A string literal cannot contain NUL (0x00) characters.")
+    assert db_error_reason(exc) == "Database error: A string literal cannot contain NUL (0x00) characters."
+
+
+def test_insert_bisecting_isolates_refused_rows(pg_conn):
+    valid, _ = validate_and_coerce_batch(read_movies("data/imdb_movie_dataset.csv"))
+    votes = STG_MOVIES_COLUMNS.index("votes")
+    title = STG_MOVIES_COLUMNS.index("title")
+    rows = [list(r) for r in valid[:200]]
+    rows[3][votes] = 3_000_000_000          # integer out of range
+    rows[150][title] = "Bad\x00Title"       # NUL, refused by psycopg2
+    rows = [tuple(r) for r in rows]
+
+    sent = []
+
+    def insert(part):
+        sent.append(len(part))
+        insert_movies(pg_conn, part)
+
+    failed = insert_bisecting(pg_conn, rows, insert)
+    pg_conn.commit()
+
+    assert [row for row, _ in failed] == [rows[3], rows[150]]
+    assert "integer out of range" in failed[0][1]
+    with pg_conn.cursor() as cur:
+        cur.execute("SELECT count(*) FROM stg_movies")
+        assert cur.fetchone()[0] == 198
+    # bisection touches O(bad rows * log n) parts, not every row separately
+    assert len(sent) < 2 * 2 * 8 + 1
+
+
+def test_insert_bisecting_clean_batch_is_one_insert(pg_conn):
+    valid, _ = validate_and_coerce_batch(read_movies("data/imdb_movie_dataset.csv"))
+    sent = []
+    failed = insert_bisecting(pg_conn, valid, lambda part: sent.append(insert_movies(pg_conn, part)))
+    assert failed == [] and sent == [len(valid)]
+
+
+def test_validation_reject_with_nul_is_stored(pg_conn):
+    raw = {"Rank": "1", "Title": "Bad\x00Title", "Revenue (Millions)": ""}
+    unstored = insert_bisecting(
+        pg_conn,
+        [(raw, "Missing Revenue")],
+        lambda part: insert_stg_rejects(pg_conn, "x.csv", part),
+    )
+    assert unstored == []
+    with pg_conn.cursor() as cur:
+        cur.execute("SELECT raw_record->>'Title' FROM stg_rejects")
+        assert cur.fetchone()[0] == "Bad\\x00Title"
+
+
+def test_rejects_raw_with_nul_and_nan_is_stored(pg_conn):
+    rejects = [
+        {"source_file": "x.csv", "raw_record": {"Title": f"T{i}", "Rating": float("nan")}, "error_reason": "Bad"}
+        for i in range(50)
+    ]
+    rejects[7]["raw_record"]["Title"] = "Bad\x00Title"
+    insert_rejects(pg_conn, rejects, commit=False)
+
+    with pg_conn.cursor() as cur:
+        cur.execute("SELECT raw_record->>'Title', raw_record->>'Rating' FROM rejects_raw ORDER BY id")
+        rows = cur.fetchall()
+    assert len(rows) == 50
+    assert rows[7] == ("Bad\\x00Title", "nan")
+
+
+def test_raw_records_with_nul_and_nan_are_stored(pg_conn):
+    records = [{"name": "Bad\x00Name", "score": float("nan")}, [1, "two"]]
+    assert insert_raw_records(pg_conn, "customers.json", records) == 2
+    with pg_conn.cursor() as cur:
+        cur.execute("SELECT record FROM raw_records ORDER BY id")
+        assert [r[0] for r in cur.fetchall()] == [{"name": "Bad\\x00Name", "score": "nan"}, [1, "two"]]
@@ -0,0 +1,50 @@
+# tests/test_logging_config.py
+import json
+import logging
+import os
+import sys
+
+"""
+Pytest suite for the logging configuration helpers.
+
+Checks per-reason sampling of reject messages (including suppressed
+counts) and the JSON line formatter.
+"""
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.Main.logging_config import JsonFormatter, RejectSampler
+
+
+def _record(msg, reason=None):
+    record = logging.LogRecord("ingest", logging.WARNING, __file__, 1, msg, None, None)
+    if reason is not None:
+        record.reject_reason = reason
+    return record
+
+
+def test_reject_sampler_limits_per_reason():
+    sampler = RejectSampler(burst=2, every=5)
+
+    passed = [sampler.filter(_record("bad", "Missing Title")) for _ in range(12)]
+    # first 2 pass, then every 5th one after the burst (7th and 12th)
+    assert passed.count(True) == 4
+    assert passed[6] and passed[11]
+
+    # a different reason has its own budget, plain records are never dropped
+    assert sampler.filter(_record("bad", "Missing Rating"))
+    assert all(sampler.filter(_record("info")) for _ in range(50))
+
+    assert sampler.suppressed_counts() == {"Missing Title": 8}
+
+
+def test_json_formatter_emits_one_object_per_line():
+    line = JsonFormatter().format(_record("Rejected row Rank=7", "Missing Revenue"))
+
+    entry = json.loads(line)
+    assert "\n" not in line
+    assert entry["level"] == "WARNING"
+    assert entry["message"] == "Rejected row Rank=7"
+    assert entry["reject_reason"] == "Missing Revenue"
@@ -0,0 +1,81 @@
+# tests/test_profiling.py
+import os
+import pstats
+import sys
+import threading
+
+"""
+Pytest suite for the per-stage profiler.
+
+Checks that StageProfiler writes one .pstats file per stage plus an
+allocation report next to the log file, honours sampling, and is a no-op
+when disabled.
+"""
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.Main.profiling import StageProfiler
+
+
+def _work():
+    return [str(i) * 10 for i in range(1000)]
+
+
+def test_profiler_writes_stats_and_alloc_report(tmp_path):
+    log_path = tmp_path / "ingestion.log"
+    profiler = StageProfiler(log_path, sample_rate=0.5)
+
+    kept = []
+    for _ in range(4):
+        with profiler.stage("transform"):
+            kept.append(_work())
+    with profiler.stage("load"):
+        _work()
+
+    written = profiler.write()
+
+    stats_file = tmp_path / "ingestion.transform.pstats"
+    report_file = tmp_path / "ingestion.alloc.txt"
+    assert stats_file in written
+    assert (tmp_path / "ingestion.load.pstats") in written
+    assert report_file in written
+
+    stats = pstats.Stats(str(stats_file))
+    assert any(func[2] == "_work" for func in stats.stats)
+
+    report = report_file.read_text()
+    assert "stage transform: sampled 2 of 4 calls" in report
+    assert "test_profiling.py" in report
+
+
+def test_stages_on_other_threads_are_profiled(tmp_path):
+    profiler = StageProfiler(tmp_path / "ingestion.log")
+
+    def _sink_thread():
+        for _ in range(3):
+            with profiler.stage("sink.load"):
+                _work()
+
+    thread = threading.Thread(target=_sink_thread)
+    with profiler.stage("fanout"):
+        thread.start()
+        thread.join()
+    profiler.write()
+
+    stats = pstats.Stats(str(tmp_path / "ingestion.sink.load.pstats"))
+    assert any(func[2] == "_work" for func in stats.stats)
+    # the producer's stage does not swallow the thread's work
+    fanout = pstats.Stats(str(tmp_path / "ingestion.fanout.pstats"))
+    assert not any(func[2] == "_work" for func in fanout.stats)
+    assert "stage sink.load: sampled 3 of 3 calls" in (tmp_path / "ingestion.alloc.txt").read_text()
+
+
+def test_disabled_profiler_writes_nothing(tmp_path):
+    profiler = StageProfiler(tmp_path / "ingestion.log", enabled=False)
+    with profiler.stage("read"):
+        _work()
+
+    assert profiler.write() == []
+    assert list(tmp_path.iterdir()) == []
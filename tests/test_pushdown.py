@@ -0,0 +1,140 @@
+# tests/test_pushdown.py
+import csv
+import io
+import math
+import os
+import re
+import sys
+
+import pytest
+
+"""
+Pytest suite for the PostgreSQL validation pushdown.
+
+The numeric patterns embedded in the SQL are checked against Python's own
+int()/float() parsing. When INGESTION_TEST_DSN points at a scratch
+PostgreSQL database, the bundled dataset is also pushed down end to end
+and compared row by row with validate_and_coerce.
+"""
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+from src.load import pushdown
+from src.reader.data_reader import read_movies
+from src.validator.validator import validate_and_coerce_batch
+
+SAMPLES = [
+    "0", "7", "-3", "+12", "007", "1_000", "1__0", "_1", "1_", "12a", "", "1.0",
+    "8.1", ".5", "5.", "-0.25", "1e3", "2.5E-2", "1_0.2_5", "1e", "e5", ".", "+.5e+2",
+    "nan", "NaN", "-nan", "inf", "+Infinity", "-INF", "infinit", "1,5", "0x10",
+]
+
+
+def _python_int(text):
+    try:
+        int(text)
+        return True
+    except ValueError:
+        return False
+
+
+def _python_float(text):
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
+
+
+def test_int_pattern_matches_python_int():
+    for text in SAMPLES:
+        assert bool(re.search(pushdown.INT_RE, text)) == _python_int(text), text
+
+
+def test_float_patterns_match_python_float():
+    specials = (pushdown.NAN_RE, pushdown.POS_INF_RE, pushdown.NEG_INF_RE)
+    for text in SAMPLES:
+        finite = bool(re.search(pushdown.FLOAT_RE, text))
+        special = any(re.search(p, text, re.IGNORECASE) for p in specials)
+        assert (finite or special) == _python_float(text), text
+        if finite:
+            assert math.isfinite(float(text)), text
+
+
+def test_pushdown_matches_python_validator(pg_conn):
+    path = "data/imdb_movie_dataset.csv"
+    expected_valid, expected_rejects = validate_and_coerce_batch(read_movies(path))
+
+    inserted, rejected = pushdown.run_pushdown(pg_conn, path)
+
+    with pg_conn.cursor() as cur:
+        cur.execute("SELECT * FROM stg_movies ORDER BY rank_num")
+        valid = [tuple(r) for r in cur.fetchall()]
+        cur.execute("SELECT source_file, raw_record, error_reason FROM stg_rejects ORDER BY id")
+        rejects = cur.fetchall()
+
+    assert (inserted, rejected) == (len(expected_valid), len(expected_rejects))
+    assert valid == sorted(expected_valid)
+    assert rejects == [(path, raw, reason) for raw, reason in expected_rejects]
+
+
+def test_pushdown_rejects_integer_overflow(pg_conn, tmp_path):
+    path = tmp_path / "overflow.csv"
+    with open("data/imdb_movie_dataset.csv", newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        header = reader.fieldnames
+        good = next(reader)
+    rows = [good, dict(good, Rank="2147483648"), dict(good, Votes="3000000000")]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, header)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    # one statement: the overflow rows must not abort it
+    inserted, rejected = pushdown.run_pushdown(pg_conn, str(path))
+
+    assert (inserted, rejected) == (1, 2)
+    with pg_conn.cursor() as cur:
+        cur.execute("SELECT error_reason FROM stg_rejects ORDER BY id")
+        assert [r[0] for r in cur.fetchall()] == ["Rank out of integer range", "Votes out of integer range"]
+
+
+def test_pushdown_handles_ragged_rows_and_float_overflow(pg_conn, tmp_path):
+    with open("data/imdb_movie_dataset.csv", encoding="utf-8") as f:
+        lines = f.read().splitlines(keepends=True)
+    header, good = lines[0], lines[1]
+    fields = next(csv.reader([good]))
+
+    def line(**changes):
+        row = dict(zip(next(csv.reader([header])), fields), **changes)
+        out = io.StringIO()
+        csv.writer(out, lineterminator="\n").writerow(row.values())
+        return out.getvalue()
+
+    path = tmp_path / "ragged.csv"
+    path.write_text(
+        header
+        + good
+        + good.rstrip("\n").rsplit(",", 1)[0] + "\n"        # one field short
+        + good.rstrip("\n") + ",extra\n"                     # one field too many
+        + line(**{"Revenue (Millions)": "1e400"})              # float() -> inf
+        + line(**{"Revenue (Millions)": "1e-400"})             # float() -> 0.0
+        + line(Rating="-1e400"),                               # -inf, out of range
+        encoding="utf-8",
+    )
+    expected_valid, expected_rejects = validate_and_coerce_batch(read_movies(str(path)))
+
+    inserted, rejected = pushdown.run_pushdown(pg_conn, str(path))
+
+    with pg_conn.cursor() as cur:
+        cur.execute("SELECT * FROM stg_movies")
+        valid = [tuple(r) for r in cur.fetchall()]
+        cur.execute("SELECT error_reason FROM stg_rejects ORDER BY id")
+        reasons = [r[0] for r in cur.fetchall()]
+    assert (inserted, rejected) == (len(expected_valid), len(expected_rejects)) == (4, 2)
+    assert sorted(valid, key=repr) == sorted(expected_valid, key=repr)
+    assert reasons == [reason for _, reason in expected_rejects]
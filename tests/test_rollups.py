@@ -0,0 +1,122 @@
+# tests/test_rollups.py
+import os
+import sys
+from contextlib import nullcontext
+
+import pytest
+
+"""
+Pytest suite for the incrementally maintained rollup tables.
+
+compute_deltas is checked against a plain GROUP BY in Python. When
+INGESTION_TEST_DSN points at a scratch PostgreSQL database, per-batch
+deltas and the pushdown path are loaded and verify_rollups must find no
+difference from a full recompute.
+"""
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+from src.load import fanout, pushdown
+from src.load.loaders import insert_movies
+from src.load.rollups import (
+    apply_rollup_deltas,
+    compute_deltas,
+    merge_deltas,
+    rebuild_rollups,
+    verify_rollups,
+)
+from src.reader.data_reader import read_movies
+from src.transform.transformers import STG_MOVIES_COLUMNS
+from src.validator.validator import validate_and_coerce_batch
+
+PATH = "data/imdb_movie_dataset.csv"
+
+
+def _movie(year, genre, director, rating, votes, revenue):
+    row = dict.fromkeys(STG_MOVIES_COLUMNS)
+    row.update(year=year, genre=genre, director=director, rating=rating, votes=votes, revenue_millions=revenue)
+    return tuple(row[c] for c in STG_MOVIES_COLUMNS)
+
+
+def test_compute_deltas_groups_and_sums():
+    rows = [
+        _movie(2010, "Drama", "Nolan", 8.0, 100, 10.0),
+        _movie(2010, "Drama", None, 6.0, 50, None),
+        _movie(2012, "Action", "Nolan", None, 10, 5.5),
+    ]
+    deltas = compute_deltas(rows)
+
+    assert deltas["rollup_year"] == {
+        2010: [2, 14.0, 2, 150, 10.0, 1],
+        2012: [1, 0.0, 0, 10, 5.5, 1],
+    }
+    assert deltas["rollup_genre"]["Drama"][0] == 2
+    # NULL director is folded into ''
+    assert deltas["rollup_director"] == {
+        "Nolan": [2, 8.0, 1, 110, 15.5, 2],
+        "": [1, 6.0, 1, 50, 0.0, 0],
+    }
+
+
+def test_merged_batch_deltas_equal_one_delta():
+    valid, _ = validate_and_coerce_batch(read_movies(PATH))
+    merged = {}
+    for start in range(0, len(valid), 64):
+        merge_deltas(merged, compute_deltas(valid[start:start + 64]))
+    whole = compute_deltas(valid)
+    for table, acc in whole.items():
+        assert merged[table].keys() == acc.keys()
+        for key, measures in acc.items():
+            assert merged[table][key] == pytest.approx(measures)
+
+
+def test_compute_deltas_empty_batch():
+    assert compute_deltas([]) == {"rollup_year": {}, "rollup_genre": {}, "rollup_director": {}}
+
+
+def test_batch_deltas_and_pushdown_match_recompute(pg_conn):
+    valid, _ = validate_and_coerce_batch(read_movies(PATH))
+    for start in range(0, len(valid), 100):
+        batch = valid[start:start + 100]
+        insert_movies(pg_conn, batch)
+        apply_rollup_deltas(pg_conn, batch)
+    pg_conn.commit()
+    pushdown.run_pushdown(pg_conn, PATH, rollups=True)
+
+    assert verify_rollups(pg_conn) == []
+    with pg_conn.cursor() as cur:
+        cur.execute("SELECT sum(movie_count) FROM rollup_year")
+        assert cur.fetchone()[0] == 2 * len(valid)
+
+
+def test_verify_reports_drift_and_rebuild_fixes_it(pg_conn):
+    valid, _ = validate_and_coerce_batch(read_movies(PATH))
+    insert_movies(pg_conn, valid)
+    pg_conn.commit()
+
+    diffs = verify_rollups(pg_conn)
+    assert {table for table, *_ in diffs} == {"rollup_year", "rollup_genre", "rollup_director"}
+
+    rebuild_rollups(pg_conn)
+    assert verify_rollups(pg_conn) == []
+
+
+def test_staging_sink_applies_rollups_once_per_chunk(pg_conn, monkeypatch):
+    valid, _ = validate_and_coerce_batch(read_movies(PATH))
+    monkeypatch.setattr(fanout, "get_connection", lambda cfg: nullcontext(pg_conn))
+    applied = []
+    apply_deltas = fanout.apply_deltas
+    monkeypatch.setattr(fanout, "apply_deltas", lambda conn, d: (applied.append(1), apply_deltas(conn, d)))
+
+    sink = fanout.StagingTablesSink({}, rollups=True, chunk_size=300)
+    with fanout.FanOutWriter([sink]) as writer:
+        for start in range(0, len(valid), 100):
+            writer.write(fanout.Batch(PATH, valid[start:start + 100], []))
+
+    # 838 rows in chunks of 300: two chunk commits plus the final one
+    assert sink.commits == len(applied) == 3
+    assert verify_rollups(pg_conn) == []
@@ -6,7 +6,10 @@ Pytest suite for the movie validator.
 
 Covers happy-path and failure scenarios to ensure validate_movie correctly
 accepts fully valid rows and rejects rows with issues like missing revenue
-or ratings outside the allowed 0–10 range, returning clear error messages.
+or ratings outside the allowed 0–10 range, returning clear error messages,
+and checks that validate_and_coerce agrees with the pre-fusion validator
+plus the transformers (tests/legacy_validator.py) on every row of the
+bundled dataset and on edge cases.
 """
 
 # Make sure the project root (where validator.py lives) is on sys.path
@@ -14,7 +17,9 @@ PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-import src.validator as validator
+from src.validator import validator
+from src.reader.data_reader import read_movies
+from tests.legacy_validator import legacy_validate_movie, validate_then_transform
 
 
 def test_valid_movie_passes_validation():
@@ -72,3 +77,75 @@ def test_rating_out_of_range_is_rejected():
 
     assert is_valid is False
     assert "Rating out of range" in error_reason
+
+
+def test_validate_and_coerce_returns_typed_values():
+    row = {
+        "Rank": "1",
+        "Title": " Guardians of the Galaxy ",
+        "Genre": "Action,Adventure,Sci-Fi",
+        "Description": "desc",
+        "Director": "James Gunn",
+        "Actors": "Chris Pratt",
+        "Year": "2014",
+        "Runtime (Minutes)": "121",
+        "Rating": "8.1",
+        "Votes": "757074",
+        "Revenue (Millions)": "333.13",
+        "Metascore": "76",
+    }
+
+    values, error_reason = validator.validate_and_coerce(row)
+
+    assert error_reason == ""
+    assert values == (
+        1, "Guardians of the Galaxy", "Action,Adventure,Sci-Fi", "desc", "James Gunn",
+        "Chris Pratt", 2014, 121, 8.1, 757074, 333.13, 76.0,
+    )
+
+
+def test_validate_and_coerce_collects_all_reasons():
+    row = {"Title": " ", "Rank": "-3", "Year": "abc", "Runtime (Minutes)": " 90 ",
+           "Rating": "11", "Votes": "", "Revenue (Millions)": "x", "Metascore": None}
+
+    values, error_reason = validator.validate_and_coerce(row)
+
+    assert values is None
+    assert error_reason == (
+        "Missing Title; Rank must be positive; Year is not an integer; "
+        "Rating out of range 0–10; Missing Votes; Revenue is not a number; "
+        "Missing Metascore"
+    )
+
+
+EDGE_ROWS = [
+    {"Title": " Padded ", "Rank": " 7 ", "Year": "2_010", "Runtime (Minutes)": " 90 ",
+     "Rating": "nan", "Votes": "+5", "Revenue (Millions)": "inf", "Metascore": "0"},
+    {"Title": "Bounds", "Rank": "1", "Year": "1900", "Runtime (Minutes)": "400",
+     "Rating": "10", "Votes": "0", "Revenue (Millions)": "-0.0", "Metascore": "100"},
+    {"Title": "Over", "Rank": "0", "Year": "2031", "Runtime (Minutes)": "0",
+     "Rating": "-inf", "Votes": "-1", "Revenue (Millions)": "-1e-9", "Metascore": "101"},
+    {"Title": "Junk", "Rank": "1.0", "Year": None, "Runtime (Minutes)": "ninety",
+     "Rating": "1,5", "Votes": "1e3", "Revenue (Millions)": "", "Metascore": "7.5"},
+    {"Title": None, "Rank": None, "Year": "", "Runtime (Minutes)": None,
+     "Rating": None, "Votes": None, "Revenue (Millions)": None, "Metascore": None},
+    {"Title": "Unicode digits", "Rank": "\u0661", "Year": "\uff12\uff10\uff11\uff10", "Runtime (Minutes)": "90",
+     "Rating": "5", "Votes": "3", "Revenue (Millions)": "1", "Metascore": "50"},
+]
+
+
+def test_validate_and_coerce_matches_legacy_validate_then_transform():
+    # compared against the pre-fusion validator kept in tests/legacy_validator.py,
+    # not against validate_movie, which now wraps validate_and_coerce
+    rows = read_movies("data/imdb_movie_dataset.csv")
+    rows += [dict(row, Genre="g", Description="d", Director="x", Actors="a") for row in EDGE_ROWS]
+
+    valid, rejects = validator.validate_and_coerce_batch(rows)
+    expected_valid, expected_rejects = validate_then_transform(rows)
+
+    # repr: NaN never compares equal to itself
+    assert repr(valid) == repr(expected_valid)
+    assert rejects == expected_rejects
+    assert (len(valid), len(rejects)) == (838 + 3, 162 + 3)
+    for row in rows:
+        assert validator.validate_movie(row) == legacy_validate_movie(row)
@@ -0,0 +1,200 @@
+# tests/test_watch.py
+import os
+import sys
+import time
+from contextlib import nullcontext
+from unittest import mock
+
+import pytest
+
+"""
+Pytest suite for the watched-directory streaming mode.
+
+Checks which files are picked up, that both watchers wake up for new files,
+that offsets survive a restart through the state file, and that new
+records are collected into size-capped micro-batches.
+"""
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+pytest.importorskip("psycopg2")
+
+from src.load.fanout import build_sinks
+from src.Main import watch
+
+
+def test_is_watched_file():
+    assert watch.is_watched_file("movies.csv")
+    assert watch.is_watched_file("customers.json")
+    assert watch.is_watched_file("events.ndjson")
+    assert not watch.is_watched_file(".movies.csv")
+    assert not watch.is_watched_file("movies.csv.part")
+    assert not watch.is_watched_file("notes.txt")
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+def test_inotify_watcher_reports_new_files(tmp_path):
+    watcher = watch.make_watcher(str(tmp_path), mode="inotify")
+    try:
+        assert watcher.wait(0) == set()
+        (tmp_path / "movies.csv").write_text("Rank,Title\n")
+        deadline = time.monotonic() + 2
+        changed = set()
+        while "movies.csv" not in changed and time.monotonic() < deadline:
+            changed |= watcher.wait(0.5) or set()
+        assert "movies.csv" in changed
+    finally:
+        watcher.close()
+
+
+def test_polling_watcher_requests_rescan(tmp_path):
+    watcher = watch.make_watcher(str(tmp_path), mode="poll", poll_seconds=0.01)
+    assert isinstance(watcher, watch.PollingWatcher)
+    assert watcher.wait(5) is None
+
+
+def test_state_round_trip(tmp_path):
+    path = str(tmp_path / "state" / "watch_state.json")
+    assert watch.load_state(path) == {}
+    watch.save_state(path, {"a.csv": {"inode": 1, "offset": 10}})
+    assert watch.load_state(path) == {"a.csv": {"inode": 1, "offset": 10}}
+    assert not os.path.exists(path + ".tmp")
+
+
+def _ingestor(tmp_path, **watch_cfg):
+    cfg = {
+        "db": {},
+        "watch": {
+            "directory": str(tmp_path / "drop"),
+            "state_file": str(tmp_path / "state.json"),
+            **watch_cfg,
+        },
+    }
+    os.makedirs(cfg["watch"]["directory"], exist_ok=True)
+    return watch.DirectoryIngestor(cfg)
+
+
+def test_full_batch_defers_other_files_and_offsets_wait_for_flush(tmp_path):
+    ingestor = _ingestor(tmp_path, max_batch_rows=3)
+    drop = tmp_path / "drop"
+    (drop / "a.ndjson").write_text("".join(f'{{"n": {i}}}\n' for i in range(5)))
+    (drop / "b.ndjson").write_text('{"n": 100}\n')
+    (drop / "ignored.txt").write_text("x\n")
+
+    ingestor._read_files(None)
+    assert ingestor._pending_rows == 5
+    assert list(ingestor._pending) == [str(drop / "a.ndjson")]
+    assert ingestor._due()
+    # nothing is committed yet, so no offsets are saved
+    assert not (tmp_path / "state.json").exists()
+
+    # pretend the micro-batch was loaded; its offsets are saved on flush
+    ingestor._pending = {}
+    ingestor._pending_rows = 0
+    ingestor.flush()
+    assert str(drop / "a.ndjson") in watch.load_state(str(tmp_path / "state.json"))
+
+    # a restart resumes from the saved offsets
+    restarted = _ingestor(tmp_path)
+    with open(drop / "a.ndjson", "a") as f:
+        f.write('{"n": 5}\n')
+    restarted._read_files(None)
+    assert restarted._pending == {
+        str(drop / "a.ndjson"): [{"n": 5}],
+        str(drop / "b.ndjson"): [{"n": 100}],
+    }
+
+
+def test_json_values_become_strings_for_the_validator():
+    row = watch._as_movie_row({"Rank": 1, "Title": "A", "Rating": 8.1, "Metascore": None})
+    assert row == {"Rank": "1", "Title": "A", "Rating": "8.1", "Metascore": None}
+
+
+
+def test_profile_is_kept_for_the_run_not_per_micro_batch(tmp_path):
+    cfg = _ingestor(tmp_path).cfg
+    cfg["sinks"] = {"staging_tables": False, "data_profile": True}
+    assert [s.name for s in build_sinks(cfg, append=True)] == []
+    assert [s.name for s in build_sinks(cfg)] == ["data_profile"]
+
+    ingestor = watch.DirectoryIngestor(cfg)
+    movies = tmp_path / "drop" / "movies.csv"
+    with open("data/imdb_movie_dataset.csv", encoding="utf-8") as f:
+        lines = f.readlines()
+    movies.write_text("".join(lines[:11]), encoding="utf-8")
+    ingestor._read_files(None)
+    ingestor.flush()
+    with open(movies, "a", encoding="utf-8") as f:
+        f.writelines(lines[11:21])
+    ingestor._read_files(None)
+    ingestor.flush()
+
+    assert ingestor.totals["batches"] == 2
+    assert ingestor.profile.rows + ingestor.profile.rejected == 20
+    assert ingestor.profile.rows == ingestor.totals["movies"]
+
+
+def test_raw_offsets_are_saved_before_the_movie_fan_out(tmp_path, monkeypatch):
+    cfg = _ingestor(tmp_path).cfg
+    cfg["sinks"] = {"staging_tables": False}
+    ingestor = watch.DirectoryIngestor(cfg)
+    drop = tmp_path / "drop"
+    (drop / "events.ndjson").write_text('{"n": 1}\n')
+    (drop / "movies.ndjson").write_text('{"Rank": 1, "Title": "A", "Year": 2010}\n')
+
+    monkeypatch.setattr(watch, "get_connection", lambda cfg: nullcontext(mock.MagicMock()))
+    monkeypatch.setattr(watch, "insert_raw_records", lambda conn, path, records: len(records))
+
+    class FailingWriter:
+        def __init__(self, sinks):
+            pass
+
+        def __enter__(self):
+            raise RuntimeError("sink failed")
+
+        def __exit__(self, *exc):
+            pass
+
+    monkeypatch.setattr(watch, "FanOutWriter", FailingWriter)
+    ingestor._read_files(None)
+    with pytest.raises(RuntimeError):
+        ingestor.flush()
+
+    saved = watch.load_state(str(tmp_path / "state.json"))
+    assert list(saved) == [str(drop / "events.ndjson")]
+    # a retry only redoes the movie file
+    assert list(ingestor._pending) == [str(drop / "movies.ndjson")]
+
+
+def test_failed_micro_batch_backs_off_and_keeps_offsets(tmp_path, monkeypatch):
+    cfg = _ingestor(tmp_path, retry_seconds=60, latency_target_ms=0).cfg
+    cfg["sinks"] = {"staging_tables": False}
+    ingestor = watch.DirectoryIngestor(cfg)
+    drop = tmp_path / "drop"
+    (drop / "movies.ndjson").write_text('{"Rank": 1, "Title": "A", "Year": 2010}\n')
+
+    class FailingWriter:
+        def __init__(self, sinks):
+            pass
+
+        def __enter__(self):
+            raise RuntimeError("database unreachable")
+
+        def __exit__(self, *exc):
+            pass
+
+    monkeypatch.setattr(watch, "FanOutWriter", FailingWriter)
+    ingestor._read_files(None)
+    assert ingestor._due()
+    assert not ingestor._try_flush()
+    # nothing saved, records kept, and no new attempt before the backoff
+    assert not (tmp_path / "state.json").exists()
+    assert ingestor._pending_rows == 1 and not ingestor._due()
+
+    monkeypatch.undo()
+    ingestor._retry_at = time.monotonic()
+    assert ingestor._due() and ingestor._try_flush()
+    assert ingestor.totals["movies"] + ingestor.totals["rejected"] == 1 and ingestor._failures == 0
+    assert str(drop / "movies.ndjson") in watch.load_state(str(tmp_path / "state.json"))